@@ -1,125 +1,874 @@
 import os
-from typing import List, Dict, Tuple
+import time
+import hashlib
+from typing import Callable, List, Dict, Tuple, Optional, Union
 from pathlib import Path
 import asyncio
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
 
 # Import from your modules
+from InterestExplorer import InterestExplorer
 from entity_extraction import EntityExtractor
 from entity_enrichment_prompt import PromptEnricher
 from text_to_image import TitanImageGenerator
-from image_to_animation import AnimationGenerator
+from image_to_animation import AnimationGenerator, ANIMATION_TIERS
+from image_backends import (
+    ImageBackend,
+    LocalSDBackend,
+    RoutingImageBackend,
+    TitanBackend,
+)
+from artifact_writer import ArtifactWriter
+from job_store import JobStore
+from frame_postprocess import FramePostProcessor
+from latent_cache import LatentCache
+from single_flight import SingleFlight, lesson_key
+from results_store import ResultsStore
+from llm_usage import UsageTracker
+from deadline import Deadline, DeadlineExceeded
+from priority_scheduler import PriorityScheduler
+from overload_controller import STAGE_BUDGETS, OverloadController
 
 # Load environment variables
 load_dotenv()
 
+# Receives progress events, e.g. {"event": "stage", "entity": ..., "stage": "image", ...}
+ProgressCallback = Callable[[Dict], None]
+
 
 class EducationalAnimationPipeline:
     def __init__(
-        self, output_base_dir: str = "pipeline_outputs", max_parallel_tasks: int = 3
+        self,
+        output_base_dir: str = "pipeline_outputs",
+        max_parallel_tasks: int = 3,
+        max_retries: int = 1,
+        stage_budgets: Optional[Dict[str, float]] = None,
+        num_keyframes: Optional[int] = None,
+        combined_llm_calls: bool = False,
+        image_backend: Union[str, ImageBackend] = "titan",
+        explorer: Optional[InterestExplorer] = None,
+        entity_extractor: Optional[EntityExtractor] = None,
+        prompt_enricher: Optional[PromptEnricher] = None,
+        animation_generator: Optional[AnimationGenerator] = None,
+        stage_slots: Optional[Dict[str, int]] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        load_shedding: bool = True,
     ):
         """
         Initialize the pipeline with all necessary components.
+
+        Args:
+            output_base_dir: Directory for images, animations and job state
+            max_parallel_tasks: Maximum number of entities processed at once
+            max_retries: Retries per entity; retries resume from the job state
+            stage_budgets: Per-stage time budgets in seconds, see Deadline
+            num_keyframes: Diffuse this many keyframes per animation and
+                interpolate the remaining frames (None to diffuse every frame)
+            combined_llm_calls: Let run_lesson get the exploration, entities and
+                image prompts from one structured chat completion
+            image_backend: "titan" (Bedrock), "local" (SD1.5 sharing the
+                animation model's weights) or "auto" (route by cost and
+                latency, falling back locally when Bedrock is slow or throttled),
+                or a ready ImageBackend
+            explorer: Replaces the OpenAI-backed InterestExplorer (e.g. a mock)
+            entity_extractor: Replaces the OpenAI-backed EntityExtractor
+            prompt_enricher: Replaces the OpenAI-backed PromptEnricher
+            animation_generator: Replaces the local PIA AnimationGenerator
+            stage_slots: Concurrent jobs per stage ("llm", "image",
+                "animation"); "animation" defaults to 1, the others to
+                max_parallel_tasks
+            tenant_weights: Fair-share weight per device/classroom
+            load_shedding: Degrade new lessons (fewer entities, still images
+                only, cached answers only) while the stage queues are overloaded
         """
         self.output_base_dir = output_base_dir
         self.max_parallel_tasks = max_parallel_tasks
+        self.max_retries = max_retries
+        self.stage_budgets = stage_budgets
+        self.num_keyframes = num_keyframes
+        self.combined_llm_calls = combined_llm_calls
+        # Stage queues decide what runs; the executor only needs a thread per
+        # slot. The animation model runs one call at a time, so more animation
+        # slots would only queue inside AnimationGenerator, out of priority order.
+        stage_slots = dict({"animation": 1}, **(stage_slots or {}))
+        self.scheduler = PriorityScheduler(
+            slots={
+                stage: stage_slots.get(stage, max_parallel_tasks)
+                for stage in ("llm", "image", "animation")
+            },
+            weights=tenant_weights,
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(self.scheduler.slots.values())
+        )
+        # Stage budgets double as the acceptable queueing delay per stage
+        budgets = Deadline(stage_budgets=stage_budgets).stage_budgets
+        self.overload = OverloadController(
+            self.scheduler,
+            latency_targets={
+                stage: budgets[budget] for stage, budget in STAGE_BUDGETS.items()
+            },
+        )
+        self.load_shedding = load_shedding
+        self.single_flight = SingleFlight()
 
         # Create output directories
         self.image_dir = os.path.join(output_base_dir, "generated_images")
         self.animation_dir = os.path.join(output_base_dir, "animations")
         os.makedirs(self.image_dir, exist_ok=True)
         os.makedirs(self.animation_dir, exist_ok=True)
+        self.job_store = JobStore(os.path.join(output_base_dir, "jobs"))
+        # Encodes and writes images/GIFs while the workers run the next entity
+        self.artifact_writer = ArtifactWriter(workers=max_parallel_tasks)
+        self.results_store = ResultsStore(os.path.join(output_base_dir, "results.db"))
 
         # Initialize components
-        self.entity_extractor = EntityExtractor()
-        self.prompt_enricher = PromptEnricher()
-        self.image_generator = TitanImageGenerator(
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_KEY"),
+        self.llm_usage = UsageTracker()
+        self.explorer = explorer or InterestExplorer(
+            os.getenv("OPENAI_API_KEY"), usage_tracker=self.llm_usage
+        )
+        self.entity_extractor = entity_extractor or EntityExtractor(
+            usage_tracker=self.llm_usage
+        )
+        self.prompt_enricher = prompt_enricher or PromptEnricher(
+            usage_tracker=self.llm_usage
+        )
+        self.animation_generator = animation_generator or AnimationGenerator(
+            output_dir=self.animation_dir,
+            postprocessor=FramePostProcessor(),
+            latent_cache=LatentCache(os.path.join(output_base_dir, "latent_cache")),
+            artifact_writer=self.artifact_writer,
+        )
+
+        self.image_generator = None
+        if isinstance(image_backend, ImageBackend):
+            self.image_backend = image_backend
+            return
+        if image_backend not in ("titan", "local", "auto"):
+            raise ValueError("image_backend must be 'titan', 'local' or 'auto'")
+        backends = []
+        if image_backend in ("titan", "auto"):
+            self.image_generator = TitanImageGenerator(
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_KEY"),
+                read_timeout=int(
+                    Deadline(stage_budgets=stage_budgets).stage_budgets["image"]
+                ),
+                artifact_writer=self.artifact_writer,
+            )
+            backends.append(TitanBackend(self.image_generator))
+        if image_backend in ("local", "auto"):
+            backends.append(
+                LocalSDBackend(
+                    self.animation_generator, artifact_writer=self.artifact_writer
+                )
+            )
+        self.image_backend = (
+            backends[0] if len(backends) == 1 else RoutingImageBackend(backends)
         )
-        self.animation_generator = AnimationGenerator(output_dir=self.animation_dir)
 
-    async def process_entity(self, entity: str, seed: int = 42) -> Dict:
-        """Process a single entity through the pipeline."""
+    async def process_entity(
+        self,
+        entity: str,
+        seed: int = 42,
+        deadline: Optional[Deadline] = None,
+        prompt: Optional[str] = None,
+        tier: str = "standard",
+        on_progress: Optional[ProgressCallback] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+        still_only: bool = False,
+        lesson: Optional[str] = None,
+    ) -> Dict:
+        """
+        Process a single entity through the pipeline.
+
+        Completed stage outputs are persisted per job, so a retry (or a
+        restarted worker) skips straight to the stage that failed and the
+        animation resumes from its last latent checkpoint. A given `prompt`
+        skips the enrichment stage. `tier` selects an ANIMATION_TIERS entry.
+        `on_progress` is called on the event loop as each stage output is
+        ready and with the final result. Each stage waits for a slot of its
+        queue by `priority` and fair share of the `tenant` (device or
+        classroom); a preempted animation requeues and resumes from its
+        checkpoint. `still_only` skips the animation stage. `lesson`
+        identifies the lesson in the job id, so the entity's stored stages
+        are only reused within that lesson.
+        """
+        result = await self._process_entity(
+            entity,
+            seed,
+            deadline,
+            prompt,
+            tier,
+            on_progress,
+            priority,
+            tenant,
+            still_only,
+            lesson,
+        )
+        if on_progress is not None:
+            # Queued like the stage events, so it arrives after them
+            asyncio.get_running_loop().call_soon(
+                on_progress, {"event": "entity", "entity": entity, "result": result}
+            )
+        return result
+
+    async def _process_entity(
+        self,
+        entity: str,
+        seed: int,
+        deadline: Optional[Deadline],
+        prompt: Optional[str],
+        tier: str,
+        on_progress: Optional[ProgressCallback],
+        priority: str,
+        tenant: str,
+        still_only: bool,
+        lesson: Optional[str],
+    ) -> Dict:
+        deadline = deadline or Deadline(stage_budgets=self.stage_budgets)
+        job_id = self.job_store.make_job_id(entity, seed, tier, lesson)
+        if prompt and self.job_store.load_state(job_id).get("prompt") != prompt:
+            # The stored image and animation belong to another prompt
+            self.job_store.reset(job_id)
+            self.job_store.save_stage(job_id, "prompt", prompt)
+        loop = asyncio.get_running_loop()
+        error = None
+
+        # Write events come from writer threads, which can outlive the loop
+        def notify(event: Dict) -> None:
+            if on_progress is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(on_progress, event)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if attempt > 0:
+                    print(f"Retrying entity {entity} (attempt {attempt + 1})")
+                result = await self._run_entity_job(
+                    entity,
+                    seed,
+                    job_id,
+                    deadline,
+                    tier,
+                    notify,
+                    priority,
+                    tenant,
+                    still_only,
+                )
+                # The worker threads are already free; wait for the files here
+                await self._await_artifacts(result)
+                return result
+
+            except DeadlineExceeded as e:
+                print(f"Deadline exceeded for entity {entity}")
+                return self._partial_result(entity, job_id, str(e))
+
+            except Exception as e:
+                print(f"Error processing entity {entity}: {str(e)}")
+                error = e
+
+        return {"entity": entity, "error": str(error)}
+
+    async def _await_artifacts(self, result: Dict) -> None:
+        """Wait until the image and animation of a result are written."""
+        for key in ("image_path", "animation_path"):
+            path = result.get(key)
+            future = self.artifact_writer.future(path) if path else None
+            if future is not None:
+                await asyncio.wrap_future(future)
+            if path and not os.path.exists(path):
+                raise Exception(f"Writing {path} failed")
+
+    def _partial_result(self, entity: str, job_id: str, error: str) -> Dict:
+        """Build the result of an unfinished entity from its completed stages."""
+        state = self.job_store.load_state(job_id)
+        result = {"entity": entity, "error": error, "partial": True}
+        for key in ("prompt", "image_path", "animation_path"):
+            if key in state:
+                result[key] = state[key]
+        return result
+
+    def _when_written(self, path: str, callback: Callable[[], None]) -> None:
+        """Call `callback` once `path` is on disk (immediately if it already is)."""
+        future = self.artifact_writer.future(path)
+        if future is None:
+            callback()
+            return
+
+        def written(future):
+            if not future.cancelled() and future.exception() is None:
+                callback()
+
+        future.add_done_callback(written)
+
+    async def _run_in_slot(
+        self,
+        stage: str,
+        priority: str,
+        tenant: str,
+        func: Callable,
+        timings: Optional[Dict[str, float]] = None,
+        timing_key: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        """
+        Run `func` on the executor once the stage queue grants a slot.
+
+        Waiting for the slot raises DeadlineExceeded once `deadline` passes.
+        The slot is held until `func` returns, even if the caller is
+        cancelled first (e.g. at the lesson deadline), since the worker
+        thread cannot be interrupted.
+        """
+        try:
+            slot = await asyncio.wait_for(
+                self.scheduler.acquire(stage, priority, tenant),
+                deadline.remaining() if deadline is not None else None,
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for a {stage} slot")
+        started = time.perf_counter()
         try:
-            # 1. Enrich the prompt
-            enriched_prompt = self.prompt_enricher.enrich_prompt(entity)
-            print(f"\nProcessing entity: {entity}")
-            print(f"Enriched prompt: {enriched_prompt}")
-
-            # 2. Generate image
-            image_paths = self.image_generator.generate_images(
-                prompt=enriched_prompt,
-                seed=seed,
-                num_images=1,
-                output_dir=self.image_dir,
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, func, slot
             )
+        except Exception:
+            self.scheduler.release(slot)
+            raise
 
-            if not image_paths:
-                raise Exception(f"Image generation failed for {entity}")
+        def finished(future):
+            if not future.cancelled():
+                # Retrieve the exception here in case the caller gave up
+                future.exception()
+            self.overload.observe(stage, time.perf_counter() - started)
+            self.scheduler.release(slot)
+
+        future.add_done_callback(finished)
+        result = await asyncio.shield(future)
+        if timings is not None:
+            key = timing_key or stage
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - started
+            timings["queued"] = timings.get("queued", 0.0) + slot.waited
+        return result, slot
 
-            image_path = image_paths[0]
-            print(f"Generated image: {image_path}")
+    async def _run_entity_job(
+        self,
+        entity: str,
+        seed: int,
+        job_id: str,
+        deadline: Deadline,
+        tier: str,
+        notify: Optional[Callable[[Dict], None]] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+        still_only: bool = False,
+    ) -> Dict:
+        """Run the stages of an entity job that have not completed yet."""
+        notify = notify or (lambda event: None)
+        state = self.job_store.load_state(job_id)
+        tier_config = ANIMATION_TIERS[tier]
+        timings = {}
 
-            # 3. Generate animation
-            animation_path, success = self.animation_generator.generate_animation(
-                image_path=image_path,
-                prompt=enriched_prompt,
-                seed=seed,
-                output_filename=f"animation_{entity}_{seed}.gif",
+        # 1. Enrich the prompt
+        enriched_prompt = state.get("prompt")
+        if enriched_prompt is None:
+            enriched_prompt, _ = await self._run_in_slot(
+                "llm",
+                priority,
+                tenant,
+                lambda slot: self.prompt_enricher.enrich_prompt(
+                    entity, timeout=deadline.timeout("enrichment")
+                ),
+                timings,
+                "enrichment",
+                deadline=deadline,
             )
+            self.job_store.save_stage(job_id, "prompt", enriched_prompt)
+        print(f"\nProcessing entity: {entity}")
+        print(f"Enriched prompt: {enriched_prompt}")
+        notify(
+            {
+                "event": "stage",
+                "entity": entity,
+                "stage": "prompt",
+                "prompt": enriched_prompt,
+            }
+        )
 
-            if not success:
-                raise Exception(f"Animation generation failed for {entity}")
+        # 2. Generate image at the smallest size the animation tier needs
+        image_path = state.get("image_path")
+        image = None
+        if image_path is None or not os.path.exists(image_path):
+            deadline.check("image")
+            images, _ = await self._run_in_slot(
+                "image",
+                priority,
+                tenant,
+                lambda slot: self.image_backend.generate(
+                    prompt=enriched_prompt,
+                    seed=seed,
+                    width=tier_config["width"],
+                    height=tier_config["height"],
+                    quality=tier_config["image_quality"],
+                    output_dir=self.image_dir,
+                    filename_prefix=job_id,
+                ),
+                timings,
+                deadline=deadline,
+            )
 
-            print(f"Generated animation: {animation_path}")
+            if not images:
+                raise Exception(f"Image generation failed for {entity}")
 
+            # Hand the decoded image to the animation stage directly
+            image_path, image = images[0]
+            self.job_store.save_stage(job_id, "image_path", image_path)
+        print(f"Generated image: {image_path}")
+        self._when_written(
+            image_path,
+            lambda: notify(
+                {
+                    "event": "stage",
+                    "entity": entity,
+                    "stage": "image",
+                    "image_path": image_path,
+                }
+            ),
+        )
+
+        if still_only and not (
+            state.get("animation_path") and os.path.exists(state["animation_path"])
+        ):
+            print(f"Skipping animation of {entity}: still images only under load")
             return {
                 "entity": entity,
                 "prompt": enriched_prompt,
                 "image_path": image_path,
-                "animation_path": animation_path,
+                "timings": timings,
+                "degraded": ["still image only: animation skipped under load"],
             }
 
-        except Exception as e:
-            print(f"Error processing entity {entity}: {str(e)}")
-            return {"entity": entity, "error": str(e)}
+        # 3. Generate animation
+        animation_path = state.get("animation_path")
+        if animation_path is None or not os.path.exists(animation_path):
+            animation_deadline = deadline.for_stage("animation")
+            while True:
+                (animation_path, success), slot = await self._run_in_slot(
+                    "animation",
+                    priority,
+                    tenant,
+                    lambda slot: self.animation_generator.generate_animation(
+                        image_path=image if image is not None else image_path,
+                        prompt=enriched_prompt,
+                        seed=seed,
+                        num_frames=tier_config["num_frames"],
+                        output_filename=f"animation_{job_id}.gif",
+                        num_inference_steps=max(
+                            4,
+                            round(
+                                self.animation_generator.default_steps
+                                * tier_config["step_scale"]
+                            ),
+                        ),
+                        job_store=self.job_store,
+                        job_id=job_id,
+                        deadline=animation_deadline,
+                        num_keyframes=self.num_keyframes,
+                        width=tier_config["width"],
+                        height=tier_config["height"],
+                        preempt=slot.preempt,
+                    ),
+                    timings,
+                    deadline=deadline,
+                )
+                if success:
+                    break
+                animation_deadline.check("animation")
+                if not slot.preempted:
+                    raise Exception(f"Animation generation failed for {entity}")
+                # Requeue; the rerun resumes from the latent checkpoint
+                print(f"Animation of {entity} preempted, requeueing")
+                notify({"event": "stage", "entity": entity, "stage": "preempted"})
+
+            self.job_store.save_stage(job_id, "animation_path", animation_path)
+
+        print(f"Generated animation: {animation_path}")
+        self._when_written(
+            animation_path,
+            lambda: notify(
+                {
+                    "event": "stage",
+                    "entity": entity,
+                    "stage": "animation",
+                    "animation_path": animation_path,
+                }
+            ),
+        )
 
-    async def run_pipeline(self, educational_content: str) -> List[Dict]:
+        return {
+            "entity": entity,
+            "prompt": enriched_prompt,
+            "image_path": image_path,
+            "animation_path": animation_path,
+            "timings": timings,
+        }
+
+    async def run_pipeline(
+        self,
+        educational_content: str,
+        deadline_seconds: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None,
+        entity_prompts: Optional[Dict[str, str]] = None,
+        tier: str = "standard",
+        on_progress: Optional[ProgressCallback] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+        max_entities: Optional[int] = None,
+        still_only: bool = False,
+        degraded: Optional[List[str]] = None,
+        lesson: Optional[str] = None,
+    ) -> List[Dict]:
         """
         Run the complete pipeline.
 
         Args:
             educational_content: The educational text content
+            deadline_seconds: Lesson-level time limit; on expiry the completed
+                stages of unfinished entities are returned as partial results
+            timings: Optional dict that receives the lesson-level stage durations
+            entity_prompts: Entities with ready image prompts; skips the
+                extraction and enrichment calls
+            tier: Animation quality tier, a key of ANIMATION_TIERS
+            on_progress: Receives the entity list, each stage output as it
+                is ready and each entity's result, see process_entity
+            priority: "interactive", "prefetch" or "batch"
+            tenant: Device or classroom the lesson is for, for fair sharing
+            max_entities: Process at most this many of the extracted entities
+            still_only: Skip the animation stage, see process_entity
+            degraded: Optional list that receives why the lesson was reduced
+            lesson: Identifies the lesson in the entity job ids (defaults to
+                a hash of educational_content)
 
         Returns:
             List of dictionaries containing results for each entity
         """
+        deadline = Deadline(deadline_seconds, stage_budgets=self.stage_budgets)
+        if lesson is None:
+            lesson = hashlib.sha1(educational_content.encode()).hexdigest()
+
         try:
+            if tier not in ANIMATION_TIERS:
+                raise ValueError(f"Unknown tier: {tier}")
             print("Starting pipeline...")
 
             # 1. Extract entities
-            print("\nExtracting entities...")
-            entities = self.entity_extractor.extract_concepts(educational_content)
-            print(f"Extracted entities: {entities}")
+            entity_prompts = entity_prompts or {}
+            if entity_prompts:
+                entities = list(entity_prompts)
+                print(f"Using planned entities: {entities}")
+            else:
+                print("\nExtracting entities...")
+                entities, _ = await self._run_in_slot(
+                    "llm",
+                    priority,
+                    tenant,
+                    lambda slot: self.entity_extractor.extract_concepts(
+                        educational_content, timeout=deadline.timeout("extraction")
+                    ),
+                    timings,
+                    "extraction",
+                    deadline=deadline,
+                )
+                print(f"Extracted entities: {entities}")
+
+                if "error" in entities[0]:
+                    raise Exception("Entity extraction failed")
 
-            if "error" in entities[0]:
-                raise Exception("Entity extraction failed")
+            if max_entities is not None and len(entities) > max_entities:
+                if degraded is not None:
+                    degraded.append(
+                        f"kept {max_entities} of {len(entities)} entities: animation queue overloaded"
+                    )
+                entities = entities[:max_entities]
+
+            if on_progress is not None:
+                on_progress({"event": "entities", "entities": entities})
 
             # 2. Process each entity in parallel
             print("\nProcessing entities in parallel...")
             tasks = []
             for i, entity in enumerate(entities):
-                tasks.append(self.process_entity(entity, seed=42 + i))
+                tasks.append(
+                    asyncio.ensure_future(
+                        self.process_entity(
+                            entity,
+                            seed=42 + i,
+                            deadline=deadline,
+                            prompt=entity_prompts.get(entity),
+                            tier=tier,
+                            on_progress=on_progress,
+                            priority=priority,
+                            tenant=tenant,
+                            still_only=still_only,
+                            lesson=lesson,
+                        )
+                    )
+                )
+
+            done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
 
-            results = await asyncio.gather(*tasks)
+            # Stop waiting on entities that missed the deadline; their worker
+            # threads stop at the next HTTP timeout or denoising step
+            for task in pending:
+                task.cancel()
+
+            results = []
+            for i, (entity, task) in enumerate(zip(entities, tasks)):
+                if task in done:
+                    results.append(task.result())
+                else:
+                    job_id = self.job_store.make_job_id(entity, 42 + i, tier, lesson)
+                    result = self._partial_result(entity, job_id, "Deadline exceeded")
+                    if on_progress is not None:
+                        asyncio.get_running_loop().call_soon(
+                            on_progress,
+                            {"event": "entity", "entity": entity, "result": result},
+                        )
+                    results.append(result)
             return results
 
         except Exception as e:
             print(f"Pipeline error: {str(e)}")
             return []
 
+    async def run_lesson(
+        self,
+        interest: str,
+        focus_aspect: str,
+        tier: str = "standard",
+        deadline_seconds: Optional[float] = None,
+        use_cache: bool = True,
+        on_progress: Optional[ProgressCallback] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+    ) -> Dict:
+        """
+        Generate a focused lesson and run the pipeline on it.
+
+        A complete lesson already in the results store (e.g. precomputed by
+        batch_precompute.py) is returned as is. Concurrent requests for the
+        same normalized (interest, focus, tier) attach to one in-flight
+        computation and share its result.
+
+        Args:
+            interest: The topic of interest
+            focus_aspect: Aspect of the topic to focus on
+            tier: Animation quality tier, a key of ANIMATION_TIERS
+            deadline_seconds: Lesson-level time limit, see run_pipeline
+            use_cache: Return a complete stored lesson instead of recomputing
+            on_progress: Receives the exploration and then the run_pipeline
+                events; requests attached to an in-flight lesson get none
+            priority: "interactive", "prefetch" or "batch"; an attached
+                request runs at the priority of the first one
+            tenant: Device or classroom the lesson is for, for fair sharing
+
+        While the stage queues are overloaded, the lesson may be reduced to
+        fewer entities or still images, or answered from stored lessons
+        only; its `degraded` list then says why.
+
+        Returns:
+            Dict: The focused exploration and the per-entity results
+        """
+        degradation = None
+        if self.load_shedding:
+            degradation = self.overload.plan(priority)
+            if degradation["cached_only"]:
+                return self._cached_only_lesson(
+                    interest, focus_aspect, tier, degradation["reasons"]
+                )
+
+        if use_cache:
+            cached = self.cached_lesson(interest, focus_aspect, tier)
+            if cached is not None:
+                print(
+                    f"Using cached lesson {cached['id']} for {interest} ({focus_aspect})"
+                )
+                return cached
+
+        key = lesson_key(interest, focus_aspect, tier)
+        return await self.single_flight.do(
+            key,
+            lambda: self._compute_lesson(
+                interest,
+                focus_aspect,
+                tier,
+                deadline_seconds,
+                on_progress,
+                priority,
+                tenant,
+                degradation,
+            ),
+        )
+
+    def _cached_only_lesson(
+        self, interest: str, focus_aspect: str, tier: str, reasons: List[str]
+    ) -> Dict:
+        """Answer from stored lessons only, preferring the exact focus and tier."""
+        print(
+            f"Overloaded, answering {interest} ({focus_aspect}) from the cache: {reasons}"
+        )
+        lesson = self.cached_lesson(interest, focus_aspect, tier)
+        if lesson is None:
+            # Any complete lesson on the same interest beats no answer
+            for candidate in self.results_store.find_by_interest(interest, limit=5):
+                if self._is_complete(candidate):
+                    lesson = candidate
+                    lesson["cached"] = True
+                    reasons = reasons + [
+                        f"served the stored lesson on {candidate['focus_aspect']!r}"
+                    ]
+                    break
+        if lesson is None:
+            return {
+                "interest": interest,
+                "focus_aspect": focus_aspect,
+                "tier": tier,
+                "results": [],
+                "error": "Overloaded and no stored lesson is available",
+                "degraded": reasons,
+            }
+        lesson["degraded"] = reasons
+        return lesson
+
+    def cached_lesson(
+        self, interest: str, focus_aspect: str, tier: str = "standard"
+    ) -> Optional[Dict]:
+        """Latest stored lesson whose entities all completed and whose files exist."""
+        lesson = self.results_store.find_lesson(interest, focus_aspect, tier)
+        if lesson is None or not self._is_complete(lesson):
+            return None
+        lesson["cached"] = True
+        return lesson
+
+    @staticmethod
+    def _is_complete(lesson: Dict) -> bool:
+        """Whether every entity of a stored lesson has its image and animation."""
+        return bool(lesson["results"]) and all(
+            "error" not in result
+            and all(
+                os.path.exists(result.get(key, ""))
+                for key in ("image_path", "animation_path")
+            )
+            for result in lesson["results"]
+        )
+
+    async def _compute_lesson(
+        self,
+        interest: str,
+        focus_aspect: str,
+        tier: str,
+        deadline_seconds: Optional[float],
+        on_progress: Optional[ProgressCallback] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+        degradation: Optional[Dict] = None,
+    ) -> Dict:
+        """Compute a lesson; called once per in-flight lesson key."""
+        deadline = Deadline(deadline_seconds, stage_budgets=self.stage_budgets)
+
+        timings = {}
+        entity_prompts = {}
+        degraded = list(degradation["reasons"]) if degradation else []
+        plan = None
+
+        try:
+            if self.combined_llm_calls:
+                print(f"\nPlanning lesson on {interest} ({focus_aspect})...")
+                plan, _ = await self._run_in_slot(
+                    "llm",
+                    priority,
+                    tenant,
+                    lambda slot: self.explorer.generate_lesson_plan(
+                        interest, focus_aspect, timeout=deadline.timeout("exploration")
+                    ),
+                    timings,
+                    "exploration",
+                    deadline=deadline,
+                )
+                if "error" in plan or not plan["entities"]:
+                    print(f"Lesson plan unusable, falling back: {plan.get('error')}")
+                    plan = None
+                else:
+                    focused_exploration = plan["focused_exploration"]
+                    entity_prompts = {e["name"]: e["prompt"] for e in plan["entities"]}
+
+            if plan is None:
+                print(
+                    f"\nGenerating focused exploration of {interest} ({focus_aspect})..."
+                )
+                focused_exploration, _ = await self._run_in_slot(
+                    "llm",
+                    priority,
+                    tenant,
+                    lambda slot: self.explorer.generate_with_focus(
+                        interest, focus_aspect, timeout=deadline.timeout("exploration")
+                    ),
+                    timings,
+                    "exploration",
+                    deadline=deadline,
+                )
+        except DeadlineExceeded as e:
+            # Nothing to show yet; answer within the deadline all the same
+            print(f"Deadline exceeded before the exploration of {interest}")
+            lesson = {
+                "interest": interest,
+                "focus_aspect": focus_aspect,
+                "tier": tier,
+                "focused_exploration": "",
+                "results": [],
+                "timings": timings,
+                "error": str(e),
+            }
+            if degraded:
+                lesson["degraded"] = degraded
+            return lesson
+
+        if on_progress is not None:
+            on_progress(
+                {"event": "exploration", "focused_exploration": focused_exploration}
+            )
+
+        results = await self.run_pipeline(
+            focused_exploration,
+            deadline.remaining(),
+            timings=timings,
+            entity_prompts=entity_prompts,
+            tier=tier,
+            on_progress=on_progress,
+            priority=priority,
+            tenant=tenant,
+            max_entities=degradation["max_entities"] if degradation else None,
+            still_only=bool(degradation and degradation["still_only"]),
+            degraded=degraded,
+            lesson="|".join(lesson_key(interest, focus_aspect, tier)),
+        )
+
+        lesson = {
+            "interest": interest,
+            "focus_aspect": focus_aspect,
+            "tier": tier,
+            "focused_exploration": focused_exploration,
+            "results": results,
+            "timings": timings,
+        }
+        if plan is not None:
+            lesson["usage"] = plan["usage"]
+        if degraded:
+            lesson["degraded"] = degraded
+        lesson["id"] = self.results_store.record_lesson(lesson)
+        return lesson
+
 
 def test_pipeline():
     """Test the complete pipeline"""
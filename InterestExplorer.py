@@ -2,29 +2,37 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import json
-import pandas as pd
 from typing import Optional, List, Dict
+from results_store import ResultsStore
+from llm_usage import UsageTracker, tracked_completion
 # Load environment variables
 load_dotenv()
 
 # Define the InterestExplorer class
 class InterestExplorer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, usage_tracker: Optional[UsageTracker] = None):
         """
         Initialize the InterestExplorer with OpenAI API key.
         
         Args:
             api_key (str): Your OpenAI API key
+            usage_tracker (UsageTracker): Records token usage per call (default: a new one)
         """
         self.client = OpenAI(api_key=api_key)
+        self.usage = usage_tracker or UsageTracker()
         
-    def generate_exploration(self, interest: str, time_to_read: Optional[int] = 1) -> str:
+    def _complete(self, call: str, timeout: Optional[float] = None, **kwargs):
+        """Create a chat completion and record its token usage under `call`."""
+        return tracked_completion(self.client, self.usage, call, timeout, **kwargs)
+
+    def generate_exploration(self, interest: str, time_to_read: Optional[int] = 1, timeout: Optional[float] = None) -> str:
         """
         Generate an exploration of the user's interest using OpenAI API.
         
         Args:
             interest (str): The topic of interest
             time_to_read (int): Desired reading time in minutes (default: 1)
+            timeout (float): Request timeout in seconds (default: client default)
             
         Returns:
             str: Generated text exploration
@@ -50,7 +58,9 @@ class InterestExplorer:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response = self._complete(
+                "generate_exploration",
+                timeout,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a knowledgeable and engaging writer who creates compelling explorations of various topics."},
@@ -67,13 +77,14 @@ class InterestExplorer:
         except Exception as e:
             return f"Error generating content: {str(e)}"
     
-    def generate_with_focus(self, interest: str, focus_aspect: str) -> str:
+    def generate_with_focus(self, interest: str, focus_aspect: str, timeout: Optional[float] = None) -> str:
         """
         Generate an exploration with a specific focus aspect.
         
         Args:
             interest (str): The main topic of interest
             focus_aspect (str): Specific aspect to focus on (e.g., "history", "future trends", "practical applications")
+            timeout (float): Request timeout in seconds (default: client default)
             
         Returns:
             str: Generated text exploration
@@ -89,7 +100,9 @@ class InterestExplorer:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response = self._complete(
+                "generate_with_focus",
+                timeout,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a knowledgeable and engaging writer who creates compelling explorations of various topics."},
@@ -105,13 +118,14 @@ class InterestExplorer:
             return f"Error generating content: {str(e)}"
         
 
-    def potential_entities(self, text: str, interest: str) -> List[Dict[str, str]]:
+    def potential_entities(self, text: str, interest: str, timeout: Optional[float] = None) -> List[Dict[str, str]]:
         """
         Extract potential physical entities from generated text that would be suitable for visual representation.
         
         Args:
             text (str): The generated text from generate_exploration or generate_with_focus
             interest (str): The original interest topic for context
+            timeout (float): Request timeout in seconds (default: client default)
             
         Returns:
             List[Dict[str, str]]: List of 3 entities with their descriptions and relevance scores
@@ -134,7 +148,9 @@ class InterestExplorer:
         """
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._complete(
+                "potential_entities",
+                timeout,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert at identifying concrete, visual elements from text that would be suitable for image or video creation."},
@@ -152,20 +168,71 @@ class InterestExplorer:
         except Exception as e:
             return [{"error": f"Error extracting entities: {str(e)}"}]
 
+    def generate_lesson_plan(self, interest: str, focus_aspect: str, max_entities: int = 4, word_count: int = 250, timeout: Optional[float] = None) -> Dict:
+        """
+        Generate the focused exploration, its visualizable entities and their
+        image prompts in a single structured chat completion.
+        
+        This replaces the generate_with_focus -> extract_concepts ->
+        enrich_prompt chain, which resends long instructions and the full
+        exploration text on every call.
+        
+        Args:
+            interest (str): The main topic of interest
+            focus_aspect (str): Specific aspect to focus on
+            max_entities (int): Maximum number of entities to return
+            word_count (int): Approximate length of the exploration
+            timeout (float): Request timeout in seconds (default: client default)
+            
+        Returns:
+            Dict: {'focused_exploration': str, 'entities': [{'name', 'prompt'}], 'usage': Dict},
+            or {'error': str} on failure
+        """
+        prompt = f"""
+        Topic: {interest}. Focus: {focus_aspect}.
+        Return a JSON object with:
+        - "exploration": ~{word_count} engaging words in clear paragraphs about how {focus_aspect} relates to {interest}, with specific examples and a thought-provoking ending
+        - "entities": up to {max_entities} objects {{"name", "prompt"}} for the most important physical things in the exploration.
+          "name" is a single word (e.g. "Earth"); "prompt" starts with "show me", adds scientific detail and ends with "highly detailed, realistic"
+        """
+        
+        try:
+            response = self._complete(
+                "generate_lesson_plan",
+                timeout,
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You write engaging educational explorations and image prompts for them."},
+                    {"role": "user", "content": prompt}
+                ],
+                # Budget: exploration (~1.4 tokens/word) plus ~40 tokens per entity
+                max_tokens=int(word_count * 1.4) + 40 * max_entities + 100,
+                temperature=0.7,
+                response_format={ "type": "json_object" }
+            )
+            
+            content = json.loads(response.choices[0].message.content)
+            entities = [
+                {"name": entity["name"].strip(), "prompt": entity["prompt"].strip()}
+                for entity in content.get("entities", [])
+                if entity.get("name") and entity.get("prompt")
+            ][:max_entities]
+            return {
+                "focused_exploration": content["exploration"].strip(),
+                "entities": entities,
+                "usage": UsageTracker.usage_of(response),
+            }
+            
+        except Exception as e:
+            return {"error": f"Error generating lesson plan: {str(e)}"}
+
 if __name__ == "__main__":
     # Replace with your OpenAI API key
     API_KEY = os.getenv("OPENAI_API_KEY")
     
     # Initialize the explorer
     explorer = InterestExplorer(API_KEY)
-    # Create empty dictionary to store results
-    results = {
-        'interest': [],
-        'basic_exploration': [],
-        'focus_aspect': [],
-        'focused_exploration': [],
-        'entities': []
-    }
+    
     # Get user input
     interest = input("What's your interest? ")
     
@@ -186,19 +253,20 @@ if __name__ == "__main__":
         print("\nExtracting potential entities for visualization...\n")
         entities = explorer.potential_entities(focused_exploration, interest)
     
-    # Add results to dictionary
-    results['interest'].append(interest)
-    results['basic_exploration'].append(exploration)
-    results['focus_aspect'].append(focus)
-    results['focused_exploration'].append(focused_exploration)
-    results['entities'].append(json.dumps(entities))  # Convert list to JSON string
+    # Collect results
+    results = {
+        'interest': interest,
+        'basic_exploration': exploration,
+        'focus_aspect': focus,
+        'focused_exploration': focused_exploration,
+        'entities': [entity for entity in entities if 'error' not in entity]
+    }
     
-    # Create DataFrame
-    df = pd.DataFrame(results)
+    # Append to the results store instead of writing a CSV per run
+    store = ResultsStore()
+    lesson_id = store.record_lesson(results)
     
-    # Display the DataFrame
+    # Display the results
     print("\nStructured Results:")
-    
-    # Optionally save to CSV
-    df.to_csv(f'exploration_{interest.lower().replace(" ", "_")}.csv', index=False)
-    print(df)
\ No newline at end of file
+    print(json.dumps(results, indent=2))
+    print(f"\nSaved as lesson {lesson_id} in {store.db_path}")
@@ -1,37 +1,65 @@
 from InterestExplorer import InterestExplorer
 import os
-import pandas as pd
 import json
+from concurrent.futures import ThreadPoolExecutor
+from results_store import ResultsStore
 
-def process_interest(explorer: InterestExplorer) -> dict:
+def process_interest(explorer: InterestExplorer, mode: str = "serial") -> dict:
     """
     Process user interest and generate explorations and entities.
     
+    Modes:
+        "serial": generate the basic exploration, then ask for a focus and
+            generate the focused exploration
+        "concurrent": generate the basic exploration in the background while
+            the focus is entered and the focused exploration is generated
+        "skip": do not generate the basic exploration
+    
+    The pipeline starts from the focused exploration when a focus was
+    given, and from the basic one otherwise. In "concurrent" mode with a
+    focus, the function does not wait for a basic exploration that is still
+    running; it is returned as a Future under 'basic_future' instead, and
+    'basic_exploration' stays empty.
+    
     Args:
         explorer (InterestExplorer): Initialized InterestExplorer instance
+        mode (str): "serial", "concurrent" or "skip"
         
     Returns:
-        dict: Dictionary containing all results
+        dict: Dictionary containing all results; 'pipeline_input' holds the
+        text the entity stage should start from
     """
+    if mode not in ("serial", "concurrent", "skip"):
+        raise ValueError("mode must be 'serial', 'concurrent' or 'skip'")
+    
     results = {
         'interest': [],
         'basic_exploration': [],
         'focus_aspect': [],
-        'focused_exploration': []#,
+        'focused_exploration': [],
+        'pipeline_input': []#,
         #'entities': []
     }
     
     # Get user input
     interest = input("What's your interest? ")
     
+    basic_exploration = ""
+    basic_future = None
+    
     # Generate basic exploration
-    print("\nGenerating exploration...\n")
-    exploration = explorer.generate_exploration(interest)
+    if mode == "serial":
+        print("\nGenerating exploration...\n")
+        basic_exploration = explorer.generate_exploration(interest)
+    elif mode == "concurrent":
+        print("\nGenerating exploration in the background...\n")
+        executor = ThreadPoolExecutor(max_workers=1)
+        basic_future = executor.submit(explorer.generate_exploration, interest)
+        executor.shutdown(wait=False)
     
     # Optional: Generate focused exploration
     focus = input("\nWould you like to explore a specific aspect? (e.g., history, applications, future trends): ")
     focused_exploration = ""
-    entities = []
     
     if focus:
         print("\nGenerating focused exploration...\n")
@@ -41,11 +69,21 @@ def process_interest(explorer: InterestExplorer) -> dict:
         #print("\nExtracting potential entities for visualization...\n")
         #entities = explorer.potential_entities(focused_exploration, interest)
     
+    if basic_future is not None and (basic_future.done() or not focus):
+        basic_exploration = basic_future.result()
+        basic_future = None
+    elif basic_future is not None:
+        # Only the focused text is needed now; the caller may collect this later
+        results['basic_future'] = basic_future
+    
     # Add results to dictionary
     results['interest'].append(interest)
-    results['basic_exploration'].append(exploration)
+    if mode != "skip" and basic_future is None:
+        results['basic_exploration'].append(basic_exploration)
     results['focus_aspect'].append(focus)
     results['focused_exploration'].append(focused_exploration)
+    # The focus is what the user asked for; the basic text only stands in without one
+    results['pipeline_input'].append(focused_exploration or basic_exploration)
     #results['entities'].append(json.dumps(entities))  # Convert list to JSON string
     
     return results
@@ -60,10 +98,14 @@ if __name__ == "__main__":
     
     # Process interest and get results
     results = process_interest(explorer)
+    basic_future = results.pop('basic_future', None)
+    if basic_future is not None:
+        results['basic_exploration'].append(basic_future.result())
     
-    # Create DataFrame
-    df = pd.DataFrame(results)
+    # Append to the results store (one row per key)
+    store = ResultsStore()
+    store.record_lesson({key: values[0] for key, values in results.items() if values})
     
-    # Display the DataFrame
+    # Display the results
     print("\nStructured Results:")
-    print(df)
\ No newline at end of file
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,112 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+def atomic_write(path: str, data: bytes) -> str:
+    """
+    Write `data` to `path` durably: temp file, fsync, rename, directory fsync.
+
+    Readers see either the previous file or the complete new one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Persist the rename itself (not supported on every platform)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return path
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+    return path
+
+
+class ArtifactWriter:
+    def __init__(self, workers: int = 2, max_pending: int = 8):
+        """
+        Initialize the ArtifactWriter.
+
+        Encodes and writes output files (GIFs, PNGs) on a pool of worker
+        threads so inference threads can move on to the next entity. The
+        queue is bounded: once `max_pending` artifacts are waiting, `submit`
+        blocks, which keeps encoded frames from piling up in memory.
+
+        Args:
+            workers (int): Number of encoding/writing threads
+            max_pending (int): Maximum number of queued artifacts
+        """
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(
+                target=self._work, name=f"artifact-writer-{i}", daemon=True
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            path, encode, future = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(atomic_write(path, encode()))
+            except Exception as e:
+                print(f"Error writing {path}: {str(e)}")
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    if self._pending.get(path) is future:
+                        del self._pending[path]
+                self._queue.task_done()
+
+    def submit(self, path: str, encode: Callable[[], bytes]) -> Future:
+        """
+        Queue `encode()` to run on a worker and its bytes to be written to `path`.
+
+        Returns:
+            Future: Resolves to `path` once the file is durably in place
+        """
+        future: Future = Future()
+        with self._lock:
+            self._pending[path] = future
+        self._queue.put((path, encode, future))
+        return future
+
+    def write_bytes(self, path: str, data: bytes) -> Future:
+        """Queue already encoded bytes to be written to `path`."""
+        return self.submit(path, lambda: data)
+
+    def future(self, path: str) -> Optional[Future]:
+        """Future of the queued or running write to `path`, None if there is none."""
+        with self._lock:
+            return self._pending.get(path)
+
+    def flush(self) -> None:
+        """Block until every queued artifact has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining artifacts and stop the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
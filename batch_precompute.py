@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from EducationalAnimationPipeline import EducationalAnimationPipeline
+from single_flight import lesson_key
+
+# Load environment variables
+load_dotenv()
+
+LESSON_STAGES = ["exploration", "extraction"]
+ENTITY_STAGES = ["enrichment", "image", "animation"]
+
+
+def load_manifest(manifest_path: str) -> List[Dict]:
+    """
+    Load a JSONL lesson manifest.
+
+    Each line is a JSON object with `interest`, `focus_aspect` (or `focus`)
+    and an optional `tier`.
+    """
+    lessons = []
+    with open(manifest_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "interest" not in entry:
+                print(f"Skipping manifest line {line_number}: no interest")
+                continue
+            lessons.append(
+                {
+                    "interest": entry["interest"],
+                    "focus_aspect": entry.get("focus_aspect", entry.get("focus", "")),
+                    "tier": entry.get("tier", "standard"),
+                }
+            )
+    return lessons
+
+
+def load_progress(progress_path: str) -> Set[str]:
+    """Keys of the lessons a previous run already completed."""
+    done = set()
+    if not os.path.exists(progress_path):
+        return done
+    with open(progress_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written last line of an interrupted run
+            if record.get("status") == "done":
+                done.add(record["key"])
+    return done
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class BatchPrecomputer:
+    def __init__(
+        self,
+        pipeline: EducationalAnimationPipeline,
+        progress_path: str,
+        concurrency: int = 2,
+        deadline_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the BatchPrecomputer.
+
+        Args:
+            pipeline: Pipeline used to compute (and store) the lessons
+            progress_path: JSONL file recording completed lessons, for resuming
+            concurrency: Maximum number of lessons computed at once
+            deadline_seconds: Per-lesson time limit
+        """
+        self.pipeline = pipeline
+        self.progress_path = progress_path
+        self.concurrency = concurrency
+        self.deadline_seconds = deadline_seconds
+        self.stage_durations: Dict[str, List[float]] = {
+            stage: [] for stage in LESSON_STAGES + ENTITY_STAGES
+        }
+        self.stage_failures: Dict[str, int] = {"lesson": 0, "entity": 0}
+        self.completed = 0
+        self.cached = 0
+        self.skipped = 0
+        self._progress_lock = asyncio.Lock()
+
+    async def _record_progress(self, record: Dict) -> None:
+        async with self._progress_lock:
+            with open(self.progress_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def _run_one(self, lesson: Dict, semaphore: asyncio.Semaphore) -> None:
+        key = json.dumps(
+            lesson_key(lesson["interest"], lesson["focus_aspect"], lesson["tier"])
+        )
+        async with semaphore:
+            print(f"\nPrecomputing {lesson['interest']} ({lesson['focus_aspect']})...")
+            try:
+                result = await self.pipeline.run_lesson(
+                    lesson["interest"],
+                    lesson["focus_aspect"],
+                    tier=lesson["tier"],
+                    deadline_seconds=self.deadline_seconds,
+                    # Yield to interactive lessons sharing the host
+                    priority="batch",
+                    tenant="batch",
+                )
+            except Exception as e:
+                print(f"Error precomputing {lesson['interest']}: {str(e)}")
+                self.stage_failures["lesson"] += 1
+                await self._record_progress(
+                    {"key": key, "status": "failed", "error": str(e)}
+                )
+                return
+
+        if result.get("cached"):
+            self.cached += 1
+        for stage, duration in result.get("timings", {}).items():
+            self.stage_durations.setdefault(stage, []).append(duration)
+
+        entity_results = result.get("results", [])
+        failed = [r for r in entity_results if "error" in r]
+        self.stage_failures["entity"] += len(failed)
+        for entity_result in entity_results:
+            for stage, duration in entity_result.get("timings", {}).items():
+                self.stage_durations.setdefault(stage, []).append(duration)
+
+        # Lessons with failed entities are retried on the next run
+        status = "done" if entity_results and not failed else "failed"
+        if status == "done":
+            self.completed += 1
+        else:
+            self.stage_failures["lesson"] += 1
+        await self._record_progress(
+            {"key": key, "status": status, "lesson_id": result.get("id")}
+        )
+
+    async def run(self, lessons: List[Dict]) -> Dict:
+        """
+        Precompute all lessons not completed by a previous run.
+
+        Returns:
+            Dict: Throughput report
+        """
+        done = load_progress(self.progress_path)
+        pending = []
+        for lesson in lessons:
+            key = json.dumps(
+                lesson_key(lesson["interest"], lesson["focus_aspect"], lesson["tier"])
+            )
+            if key in done:
+                self.skipped += 1
+            else:
+                pending.append(lesson)
+        print(f"{len(pending)} lessons to precompute, {self.skipped} already done")
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[self._run_one(lesson, semaphore) for lesson in pending])
+        return self.report(time.perf_counter() - started)
+
+    def report(self, wall_time: float) -> Dict:
+        """Build the throughput report of the run."""
+        stages = {}
+        for stage, durations in self.stage_durations.items():
+            if not durations:
+                continue
+            stages[stage] = {
+                "count": len(durations),
+                "mean_s": sum(durations) / len(durations),
+                "p50_s": _percentile(durations, 0.5),
+                "p95_s": _percentile(durations, 0.95),
+                "per_hour": len(durations) / wall_time * 3600 if wall_time else 0.0,
+            }
+        return {
+            "wall_time_s": wall_time,
+            "lessons_completed": self.completed,
+            "lessons_cached": self.cached,
+            "lessons_skipped": self.skipped,
+            "lessons_failed": self.stage_failures["lesson"],
+            "entities_failed": self.stage_failures["entity"],
+            "lessons_per_hour": self.completed / wall_time * 3600 if wall_time else 0.0,
+            "stages": stages,
+        }
+
+
+def print_report(report: Dict) -> None:
+    print("\nThroughput report:")
+    print(f"Wall time: {report['wall_time_s']:.1f}s")
+    print(
+        f"Lessons: {report['lessons_completed']} completed "
+        f"({report['lessons_cached']} cached), {report['lessons_skipped']} skipped, "
+        f"{report['lessons_failed']} failed ({report['entities_failed']} failed entities)"
+    )
+    print(f"Lessons per hour: {report['lessons_per_hour']:.1f}")
+    print(
+        f"\n{'stage':<12}{'count':>7}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'per hour':>10}"
+    )
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:<12}{stats['count']:>7}{stats['mean_s']:>10.2f}"
+            f"{stats['p50_s']:>10.2f}{stats['p95_s']:>10.2f}{stats['per_hour']:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute a topic library from a JSONL lesson manifest."
+    )
+    parser.add_argument("manifest", help="JSONL file of {interest, focus_aspect, tier}")
+    parser.add_argument("--output-dir", default="pipeline_outputs")
+    parser.add_argument("--concurrency", type=int, default=2, help="Lessons at once")
+    parser.add_argument(
+        "--workers", type=int, default=3, help="Pipeline worker threads"
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=None, help="Per-lesson seconds"
+    )
+    parser.add_argument(
+        "--progress",
+        default=None,
+        help="Progress file (default: <manifest>.progress.jsonl)",
+    )
+    parser.add_argument("--report", default=None, help="Write the report as JSON here")
+    args = parser.parse_args()
+
+    progress_path = (
+        args.progress or f"{os.path.splitext(args.manifest)[0]}.progress.jsonl"
+    )
+    pipeline = EducationalAnimationPipeline(
+        output_base_dir=args.output_dir, max_parallel_tasks=args.workers
+    )
+    precomputer = BatchPrecomputer(
+        pipeline,
+        progress_path=progress_path,
+        concurrency=args.concurrency,
+        deadline_seconds=args.deadline,
+    )
+
+    report = asyncio.run(precomputer.run(load_manifest(args.manifest)))
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import time
+from typing import Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a lesson or one of its stages runs out of time."""
+
+
+class Deadline:
+    # Default per-stage budgets in seconds, capped by the lesson deadline
+    DEFAULT_STAGE_BUDGETS = {
+        "exploration": 30.0,
+        "extraction": 20.0,
+        "enrichment": 15.0,
+        "image": 45.0,
+        "animation": 300.0,
+    }
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        stage_budgets: Optional[Dict[str, float]] = None,
+        expires_at: Optional[float] = None,
+    ):
+        """
+        Initialize a deadline.
+
+        Args:
+            seconds: Time budget from now, None for no limit
+            stage_budgets: Per-stage budgets in seconds (defaults to DEFAULT_STAGE_BUDGETS)
+            expires_at: Absolute `time.monotonic()` expiry, overrides `seconds`
+        """
+        if expires_at is None and seconds is not None:
+            expires_at = time.monotonic() + seconds
+        self.expires_at = expires_at
+        self.stage_budgets = dict(self.DEFAULT_STAGE_BUDGETS)
+        if stage_budgets:
+            self.stage_budgets.update(stage_budgets)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, None if there is no limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self, stage: str = "lesson") -> None:
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline exceeded during {stage}")
+
+    def for_stage(self, stage: str) -> "Deadline":
+        """
+        Derive the deadline of a single stage.
+
+        The stage deadline is the earlier of the stage budget and the
+        remaining lesson time.
+        """
+        self.check(stage)
+        expires_at = self.expires_at
+        budget = self.stage_budgets.get(stage)
+        if budget is not None:
+            stage_expiry = time.monotonic() + budget
+            expires_at = (
+                stage_expiry if expires_at is None else min(expires_at, stage_expiry)
+            )
+        return Deadline(stage_budgets=self.stage_budgets, expires_at=expires_at)
+
+    def timeout(self, stage: str) -> Optional[float]:
+        """Timeout in seconds for a call made in `stage`."""
+        return self.for_stage(stage).remaining()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import torch
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 128,
+        cache_dir: Optional[str] = None,
+        namespace: str = "",
+    ):
+        """
+        Initialize the EmbeddingCache.
+
+        Text-encoder outputs are kept in memory with LRU eviction and, if
+        `cache_dir` is given, also on disk so they survive restarts.
+
+        Args:
+            max_entries (int): Maximum number of embeddings kept in memory
+            cache_dir (str): Directory for on-disk embeddings, None for memory only
+            namespace (str): Mixed into the keys, e.g. the text encoder's model id
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def get(self, text: str) -> Optional[torch.Tensor]:
+        """Cached embedding of `text`, or None."""
+        key = self._key(text)
+        with self._lock:
+            embeds = self._entries.get(key)
+            if embeds is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embeds
+
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                embeds = torch.load(self._disk_path(key), map_location="cpu")
+            except Exception as e:
+                print(f"Ignoring unreadable cached embedding: {str(e)}")
+            else:
+                self._store(key, embeds)
+                with self._lock:
+                    self.hits += 1
+                return embeds
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key: str, embeds: torch.Tensor) -> None:
+        with self._lock:
+            self._entries[key] = embeds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, text: str, embeds: torch.Tensor) -> None:
+        """Cache the embedding of `text`."""
+        key = self._key(text)
+        embeds = embeds.detach()
+        self._store(key, embeds)
+        if self.cache_dir:
+            tmp_path = f"{self._disk_path(key)}.tmp"
+            torch.save(embeds.to("cpu"), tmp_path)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def get_or_compute(
+        self, text: str, compute: Callable[[str], torch.Tensor]
+    ) -> torch.Tensor:
+        """Cached embedding of `text`, computing and caching it on a miss."""
+        embeds = self.get(text)
+        if embeds is None:
+            embeds = compute(text)
+            self.put(text, embeds)
+        return embeds
@@ -1,20 +1,25 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
 
+from llm_usage import UsageTracker, tracked_completion
+
 # Load environment variables
 load_dotenv()
 
 
 class PromptEnricher:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self, api_key: str = None, usage_tracker: Optional[UsageTracker] = None
+    ):
         """Initialize the PromptEnricher."""
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not found")
 
         self.client = OpenAI(api_key=self.api_key)
+        self.usage = usage_tracker or UsageTracker()
 
         # Default prompt enrichment templates
         self.default_templates = {
@@ -25,13 +30,14 @@ class PromptEnricher:
             "blackhole": "show me a black hole with accretion disk and gravitational lensing, scientifically accurate",
         }
 
-    def enrich_prompt(self, entity: str) -> str:
+    def enrich_prompt(self, entity: str, timeout: Optional[float] = None) -> str:
         """
         Convert a simple entity into a detailed image generation prompt.
         First checks predefined templates, then uses GPT for custom enrichment.
 
         Args:
             entity: Single word entity to enrich
+            timeout: Request timeout in seconds, None for the client default
 
         Returns:
             Enriched prompt string
@@ -57,7 +63,11 @@ class PromptEnricher:
             Example output: show me the Earth from space, highly detailed, realistic
             """
 
-            response = self.client.chat.completions.create(
+            response = tracked_completion(
+                self.client,
+                self.usage,
+                "enrich_prompt",
+                timeout,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
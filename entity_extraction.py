@@ -1,28 +1,34 @@
 import os
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from openai import OpenAI
 import ast
 from dotenv import load_dotenv
 
+from llm_usage import UsageTracker, tracked_completion
+
 # Load environment variables
 load_dotenv()
 
 
 class EntityExtractor:
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self, api_key: str = None, usage_tracker: Optional[UsageTracker] = None
+    ):
         """Initialize the EntityExtractor."""
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not found")
 
         self.client = OpenAI(api_key=self.api_key)
+        self.usage = usage_tracker or UsageTracker()
 
-    def extract_concepts(self, text: str) -> List[str]:
+    def extract_concepts(self, text: str, timeout: Optional[float] = None) -> List[str]:
         """
         Extract key educational concepts from text that could be visualized.
 
         Args:
             text: Educational content to extract concepts from
+            timeout: Request timeout in seconds, None for the client default
 
         Returns:
             List of key concepts that can be visualized
@@ -40,7 +46,11 @@ class EntityExtractor:
         """
 
         try:
-            response = self.client.chat.completions.create(
+            response = tracked_completion(
+                self.client,
+                self.usage,
+                "extract_concepts",
+                timeout,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
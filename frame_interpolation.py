@@ -0,0 +1,79 @@
+import numpy as np
+from typing import List
+from PIL import Image
+
+
+def keyframe_times(num_keyframes: int, num_frames: int) -> np.ndarray:
+    """
+    Position of every output frame on the keyframe timeline.
+
+    Keyframes are spread evenly over the output, so the first and last
+    output frames are the first and last keyframes.
+
+    Args:
+        num_keyframes: Number of generated keyframes
+        num_frames: Number of output frames
+
+    Returns:
+        np.ndarray: Fractional keyframe index of each output frame
+    """
+    if num_frames == 1:
+        return np.zeros(1)
+    return np.arange(num_frames) * ((num_keyframes - 1) / (num_frames - 1))
+
+
+def interpolate_frames(keyframes: np.ndarray, num_frames: int) -> np.ndarray:
+    """
+    Synthesize in-between frames by blending neighbouring keyframes.
+
+    The whole clip is computed in one vectorized pass over the
+    (frames, H, W, C) array.
+
+    Args:
+        keyframes: Keyframes of shape (K, H, W, C), float in [0, 1] or uint8
+        num_frames: Number of output frames (>= K)
+
+    Returns:
+        np.ndarray: Frames of shape (num_frames, H, W, C), same dtype as input
+    """
+    num_keyframes = keyframes.shape[0]
+    if num_frames < num_keyframes:
+        raise ValueError("num_frames must be at least the number of keyframes")
+    if num_keyframes == 1 or num_frames == num_keyframes:
+        return np.repeat(keyframes, num_frames // num_keyframes, axis=0)
+
+    times = keyframe_times(num_keyframes, num_frames)
+    left = np.minimum(np.floor(times).astype(np.int64), num_keyframes - 2)
+    weights = (times - left).astype(np.float32)[:, None, None, None]
+
+    frames = keyframes.astype(np.float32)
+    blended = frames[left] * (1.0 - weights) + frames[left + 1] * weights
+
+    if keyframes.dtype == np.uint8:
+        return np.clip(np.rint(blended), 0, 255).astype(np.uint8)
+    return blended.astype(keyframes.dtype)
+
+
+def to_pil_frames(frames: np.ndarray) -> List[Image.Image]:
+    """Convert (F, H, W, C) frames, float in [0, 1] or uint8, to PIL images."""
+    if frames.dtype != np.uint8:
+        frames = np.clip(np.rint(frames * 255.0), 0, 255).astype(np.uint8)
+    return [Image.fromarray(frame) for frame in frames]
+
+
+def test_interpolate_frames():
+    """Test function for the keyframe interpolation."""
+    keyframes = np.stack(
+        [np.full((4, 4, 3), value, dtype=np.uint8) for value in (0, 120, 240)]
+    )
+    frames = interpolate_frames(keyframes, 9)
+
+    print(f"Interpolated {len(keyframes)} keyframes into {len(frames)} frames")
+    print(f"Frame values: {frames[:, 0, 0, 0].tolist()}")
+    assert frames.shape == (9, 4, 4, 3)
+    assert frames[0, 0, 0, 0] == 0 and frames[-1, 0, 0, 0] == 240
+    assert frames[4, 0, 0, 0] == 120
+
+
+if __name__ == "__main__":
+    test_interpolate_frames()
@@ -0,0 +1,262 @@
+import io
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from PIL import Image
+from diffusers import StableDiffusionPipeline, UNet2DConditionModel
+
+from artifact_writer import ArtifactWriter, atomic_write
+from text_to_image import TitanImageGenerator
+from image_to_animation import AnimationGenerator
+
+
+class ImageBackend(ABC):
+    # Estimated cost of one image in USD and latency prior in seconds,
+    # used for routing until real latencies have been observed
+    cost_per_image = 0.0
+    expected_latency = 10.0
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    @abstractmethod
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        width: int,
+        height: int,
+        quality: str = "standard",
+        output_dir: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        """
+        Generate one image of at least `width` x `height`.
+
+        Args:
+            prompt: Image prompt
+            seed: Random seed
+            width: Minimum image width
+            height: Minimum image height
+            quality: "standard" or "premium"
+            output_dir: Directory to save the PNG in, None to keep it in memory
+            filename_prefix: Saved file is `image_<prefix>_1.png`
+
+        Returns:
+            List[Tuple[Optional[str], Image.Image]]: (saved path or None, image)
+        """
+
+
+class TitanBackend(ImageBackend):
+    cost_per_image = 0.008
+    expected_latency = 8.0
+
+    def __init__(self, generator: TitanImageGenerator):
+        """Bedrock Titan Image Generator backend."""
+        self.generator = generator
+
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        width: int,
+        height: int,
+        quality: str = "standard",
+        output_dir: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        width, height = self.generator.negotiate_size(width, height)
+        return self.generator.generate_pil_images(
+            prompt=prompt,
+            seed=seed,
+            quality=quality,
+            width=width,
+            height=height,
+            num_images=1,
+            output_dir=output_dir,
+            filename_prefix=filename_prefix,
+        )
+
+
+class LocalSDBackend(ImageBackend):
+    expected_latency = 60.0
+    # Denoising steps per Titan quality level
+    STEPS = {"standard": 25, "premium": 40}
+
+    def __init__(
+        self,
+        animation_generator: AnimationGenerator,
+        artifact_writer: Optional[ArtifactWriter] = None,
+    ):
+        """
+        Local SD1.5 text-to-image backend.
+
+        Shares the VAE, text encoder and tokenizer that `animation_generator`
+        already holds in memory. The PIA pipeline only keeps the motion UNet,
+        so the 2D UNet is loaded from the same Realistic Vision checkpoint.
+
+        Args:
+            animation_generator: Generator whose PIA pipeline is reused; it is
+                switched to keep its pipeline loaded between calls
+            artifact_writer: Encodes and writes the PNG off the calling thread
+        """
+        self.animation_generator = animation_generator
+        self.artifact_writer = artifact_writer
+        self.animation_generator.keep_loaded = True
+        self.pipe = None
+
+    def _setup_pipeline(self) -> StableDiffusionPipeline:
+        pia = self.animation_generator.load_pipeline()
+
+        print("Loading SD1.5 UNet for local text-to-image...")
+        unet = UNet2DConditionModel.from_pretrained(
+            AnimationGenerator.MODEL_ID,
+            subfolder="unet",
+            torch_dtype=pia.unet.dtype,
+        ).to(self.animation_generator.device)
+
+        pipe = StableDiffusionPipeline(
+            vae=pia.vae,
+            text_encoder=pia.text_encoder,
+            tokenizer=pia.tokenizer,
+            unet=unet,
+            scheduler=pia.scheduler.__class__.from_config(pia.scheduler.config),
+            safety_checker=None,
+            feature_extractor=None,
+            requires_safety_checker=False,
+        )
+        pipe.set_progress_bar_config(disable=True)
+        return pipe
+
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        width: int,
+        height: int,
+        quality: str = "standard",
+        output_dir: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        # SD needs multiples of 8; generate exactly the requested size
+        width, height = 8 * math.ceil(width / 8), 8 * math.ceil(height / 8)
+
+        # The shared modules must not run in two pipelines at once
+        with self.animation_generator.lock:
+            if self.pipe is None:
+                self.pipe = self._setup_pipeline()
+
+            print(f"Generating local image with prompt: '{prompt}'")
+            image = self.pipe(
+                prompt=prompt,
+                negative_prompt=TitanImageGenerator.DEFAULT_NEGATIVE_PROMPT,
+                width=width,
+                height=height,
+                num_inference_steps=self.STEPS.get(quality, self.STEPS["standard"]),
+                generator=torch.Generator("cpu").manual_seed(seed),
+            ).images[0]
+
+        path = None
+        if output_dir is not None:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            path = f"{output_dir}/image_{filename_prefix or seed}_1.png"
+
+            def encode_png() -> bytes:
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                return buffer.getvalue()
+
+            if self.artifact_writer is not None:
+                self.artifact_writer.submit(path, encode_png)
+                print(f"Queued image 1 for writing to {path}")
+            else:
+                atomic_write(path, encode_png())
+                print(f"Saved image 1 to {path}")
+        return [(path, image)]
+
+
+class RoutingImageBackend(ImageBackend):
+    def __init__(
+        self,
+        backends: List[ImageBackend],
+        latency_cost: float = 0.001,
+        cooldown: float = 60.0,
+        smoothing: float = 0.3,
+    ):
+        """
+        Route each request to the backend with the lowest expected cost.
+
+        The expected cost of a backend is its price per image plus its
+        latency priced at `latency_cost` USD per second, with latency tracked
+        as an exponentially weighted moving average. A backend that fails
+        (e.g. throttled) is skipped for `cooldown` seconds and the request
+        falls back to the next backend.
+
+        Args:
+            backends: Candidate backends
+            latency_cost: Price of one second of latency in USD
+            cooldown: Seconds a failed backend is skipped for
+            smoothing: EWMA weight of the newest latency sample
+        """
+        self.backends = backends
+        self.latency_cost = latency_cost
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.latency: Dict[str, float] = {}
+        self.failed_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _ranked(self) -> List[ImageBackend]:
+        """Backends in the order they should be tried."""
+        now = time.monotonic()
+        with self._lock:
+
+            def rank(backend: ImageBackend):
+                cooling = self.failed_until.get(backend.name, 0) > now
+                latency = self.latency.get(backend.name, backend.expected_latency)
+                return (cooling, backend.cost_per_image + self.latency_cost * latency)
+
+            return sorted(self.backends, key=rank)
+
+    def _observe(self, backend: ImageBackend, elapsed: Optional[float]) -> None:
+        with self._lock:
+            if elapsed is None:
+                self.failed_until[backend.name] = time.monotonic() + self.cooldown
+                return
+            previous = self.latency.get(backend.name)
+            self.latency[backend.name] = (
+                elapsed
+                if previous is None
+                else self.smoothing * elapsed + (1 - self.smoothing) * previous
+            )
+
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        width: int,
+        height: int,
+        quality: str = "standard",
+        output_dir: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        errors = []
+        for backend in self._ranked():
+            started = time.perf_counter()
+            try:
+                images = backend.generate(
+                    prompt, seed, width, height, quality, output_dir, filename_prefix
+                )
+                self._observe(backend, time.perf_counter() - started)
+                return images
+            except Exception as e:
+                print(f"Image backend {backend.name} failed, falling back: {str(e)}")
+                self._observe(backend, None)
+                errors.append(f"{backend.name}: {str(e)}")
+        raise Exception(f"All image backends failed ({'; '.join(errors)})")
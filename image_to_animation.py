@@ -1,25 +1,130 @@
 import os
 import torch
-from diffusers import EulerDiscreteScheduler, MotionAdapter, PIAPipeline
-from diffusers.utils import export_to_gif, load_image
+import numpy as np
+from diffusers import MotionAdapter, PIAPipeline
+from diffusers.utils import load_image
 import matplotlib.pyplot as plt
 import gc
+import io
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
 from typing import Optional, Union, Tuple
 from pathlib import Path
+from PIL import Image
+
+from artifact_writer import ArtifactWriter, atomic_write
+from job_store import JobStore
+from deadline import Deadline, DeadlineExceeded
+from priority_scheduler import Preempted
+from frame_interpolation import interpolate_frames, to_pil_frames
+from frame_postprocess import FramePostProcessor, fit_image
+from embedding_cache import EmbeddingCache
+from latent_cache import LatentCache
+from schedulers import (
+    DEFAULT_SCHEDULER,
+    DEFAULT_STEPS,
+    DEFAULT_TUNING_PATH,
+    load_tuned_config,
+    make_scheduler,
+)
+
+try:
+    from diffusers.models.autoencoders.vae import DiagonalGaussianDistribution
+except ImportError:  # diffusers < 0.26
+    from diffusers.models.vae import DiagonalGaussianDistribution
+
+# Animation quality tiers: input/output resolution, frame count, denoising
+# steps (relative to the host's tuned step count) and the Titan quality used
+# for the conditioning image
+ANIMATION_TIERS = {
+    "draft": {
+        "width": 384,
+        "height": 384,
+        "num_frames": 8,
+        "step_scale": 0.5,
+        "image_quality": "standard",
+    },
+    "standard": {
+        "width": 512,
+        "height": 512,
+        "num_frames": 16,
+        "step_scale": 1.0,
+        "image_quality": "standard",
+    },
+    "high": {
+        "width": 768,
+        "height": 768,
+        "num_frames": 16,
+        "step_scale": 1.0,
+        "image_quality": "premium",
+    },
+}
 
 
 class AnimationGenerator:
-    def __init__(self, output_dir: str = "outputs"):
+    MODEL_ID = "SG161222/Realistic_Vision_V6.0_B1_noVAE"
+    ADAPTER_ID = "openmmlab/PIA-condition-adapter"
+
+    def __init__(
+        self,
+        output_dir: str = "outputs",
+        postprocessor: Optional[FramePostProcessor] = None,
+        fit_mode: str = "letterbox",
+        keep_loaded: bool = True,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        latent_cache: Optional[LatentCache] = None,
+        tuning_path: Optional[str] = DEFAULT_TUNING_PATH,
+        artifact_writer: Optional[ArtifactWriter] = None,
+    ):
         """
         Initialize the AnimationGenerator.
 
         Args:
             output_dir (str): Directory to save output animations
+            postprocessor (FramePostProcessor): Batched frame post-processing
+                applied before encoding (None exports the raw frames)
+            fit_mode (str): How the input image is fitted to the animation size,
+                "letterbox" or "crop"
+            keep_loaded (bool): Keep the pipeline in memory between calls
+                (False frees it after every call, reloading it the next time)
+            embedding_cache (EmbeddingCache): Cache of text-encoder outputs,
+                defaults to an in-memory LRU cache
+            latent_cache (LatentCache): Cache of VAE-encoded conditioning
+                images (None disables it)
+            tuning_path (str): Scheduler tuning written by scheduler_tuner.py;
+                this host's entry selects the scheduler and default step count
+                (None to use the untuned defaults)
+            artifact_writer (ArtifactWriter): Post-processes, encodes and writes
+                the GIF off the calling thread (None writes it before returning)
         """
         self.output_dir = output_dir
+        self.postprocessor = postprocessor
+        self.fit_mode = fit_mode
+        self.keep_loaded = keep_loaded
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            namespace=self.MODEL_ID
+        )
+        self.latent_cache = latent_cache
+        self.artifact_writer = artifact_writer
+
+        tuned = load_tuned_config(tuning_path) if tuning_path else None
+        self.scheduler_name = tuned["scheduler"] if tuned else DEFAULT_SCHEDULER
+        self.default_steps = tuned["num_inference_steps"] if tuned else DEFAULT_STEPS
+        if tuned:
+            print(
+                f"Using tuned scheduler {self.scheduler_name} with {self.default_steps} steps"
+            )
         self.pipe = None
         self.adapter = None
-        self.device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
+        # Held while loading or running the pipeline; shared with components
+        # that reuse its weights (LocalSDBackend)
+        self.lock = threading.RLock()
+        self.device = (
+            "cuda"
+            if torch.cuda.is_available()
+            else "mps" if torch.backends.mps.is_available() else "cpu"
+        )
         print(f"Using device: {self.device}")
         os.makedirs(output_dir, exist_ok=True)
 
@@ -27,13 +132,11 @@ class AnimationGenerator:
         """Set up the PIA pipeline and motion adapter."""
         try:
             print("Loading motion adapter...")
-            self.adapter = MotionAdapter.from_pretrained(
-                "openmmlab/PIA-condition-adapter"
-            )
+            self.adapter = MotionAdapter.from_pretrained(self.ADAPTER_ID)
 
             print("Loading PIA pipeline...")
             self.pipe = PIAPipeline.from_pretrained(
-                "SG161222/Realistic_Vision_V6.0_B1_noVAE",
+                self.MODEL_ID,
                 motion_adapter=self.adapter,
                 torch_dtype=torch.float16,
             )
@@ -42,8 +145,8 @@ class AnimationGenerator:
             self.pipe.to(self.device)
 
             # Set up scheduler and optimizations
-            self.pipe.scheduler = EulerDiscreteScheduler.from_config(
-                self.pipe.scheduler.config
+            self.pipe.scheduler = make_scheduler(
+                self.scheduler_name, self.pipe.scheduler.config
             )
             # Only enable these optimizations for CUDA
             if self.device == "cuda":
@@ -56,109 +159,357 @@ class AnimationGenerator:
         except Exception as e:
             raise RuntimeError(f"Failed to setup pipeline: {str(e)}")
 
+    def load_pipeline(self) -> PIAPipeline:
+        """Return the PIA pipeline, setting it up if needed."""
+        with self.lock:
+            if self.pipe is None:
+                self._setup_pipeline()
+            return self.pipe
+
+    def _encode_text(self, text: str) -> torch.Tensor:
+        """CLIP embedding of `text`, from the cache when possible."""
+
+        def encode(text: str) -> torch.Tensor:
+            prompt_embeds, _ = self.pipe.encode_prompt(
+                text,
+                self.device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=False,
+            )
+            return prompt_embeds
+
+        return self.embedding_cache.get_or_compute(text, encode).to(
+            self.device, dtype=self.pipe.text_encoder.dtype
+        )
+
+    @contextmanager
+    def _cached_image_latents(self, key: Optional[str]):
+        """
+        Serve the pipeline's VAE encode of the conditioning image from the cache.
+
+        The latent distribution parameters are cached rather than a sample,
+        so sampling still follows the call's generator. Patches the shared
+        VAE, so only use it with `self.lock` held.
+        """
+        if self.latent_cache is None or key is None:
+            yield
+            return
+
+        vae = self.pipe.vae
+        encode = vae.encode
+        cached = self.latent_cache.get(key)
+
+        def cached_encode(x, return_dict=True):
+            if cached is not None:
+                parameters = torch.from_numpy(np.array(cached)).to(x.device, x.dtype)
+                dist = DiagonalGaussianDistribution(parameters)
+                return SimpleNamespace(latent_dist=dist) if return_dict else (dist,)
+            output = encode(x, return_dict=return_dict)
+            dist = output.latent_dist if return_dict else output[0]
+            self.latent_cache.put(key, dist.parameters.detach().float().cpu().numpy())
+            return output
+
+        vae.encode = cached_encode
+        try:
+            yield
+        finally:
+            del vae.encode
+
     def _cleanup(self):
         """Clean up GPU memory."""
-        if hasattr(self, "pipe"):
-            del self.pipe
-        if hasattr(self, "adapter"):
-            del self.adapter
+        # Reset rather than delete so the next call can set the pipeline up again
+        if not self.keep_loaded:
+            self.pipe = None
+            self.adapter = None
         torch.cuda.empty_cache()
         gc.collect()
 
+    def _encode_gif(
+        self, frames, num_frames: int, num_keyframes: Optional[int]
+    ) -> bytes:
+        """Interpolate, post-process and encode frames; runs on a writer thread."""
+        if num_keyframes is not None and 1 < num_keyframes < num_frames:
+            print(f"Interpolating {num_keyframes} keyframes to {num_frames} frames...")
+            frames = interpolate_frames(np.asarray(frames), num_frames)
+            if self.postprocessor is None:
+                frames = to_pil_frames(frames)
+        if self.postprocessor is not None:
+            return self.postprocessor.encode_gif(self.postprocessor.process(frames))
+        # Same timing as export_to_gif's default of 10 fps
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer,
+            format="GIF",
+            save_all=True,
+            append_images=frames[1:],
+            optimize=False,
+            duration=100,
+            loop=0,
+        )
+        return buffer.getvalue()
+
     def generate_animation(
         self,
-        image_path: Union[str, Path],
+        image_path: Union[str, Path, Image.Image],
         prompt: str,
         negative_prompt: Optional[str] = None,
         seed: int = 0,
         num_frames: int = 16,
         output_filename: Optional[str] = None,
+        num_inference_steps: Optional[int] = None,
+        job_store: Optional[JobStore] = None,
+        job_id: Optional[str] = None,
+        checkpoint_every: int = 5,
+        deadline: Optional[Deadline] = None,
+        num_keyframes: Optional[int] = None,
+        width: int = 512,
+        height: int = 512,
+        preempt: Optional[threading.Event] = None,
     ) -> Tuple[str, bool]:
         """
         Generate an animation from an input image.
 
         Args:
-            image_path: Path to input image
+            image_path: Path to input image, or the decoded image itself
             prompt: Text prompt for animation
             negative_prompt: Negative prompt for generation
             seed: Random seed for reproducibility
             num_frames: Number of frames to generate
             output_filename: Custom filename for output GIF
+            num_inference_steps: Number of denoising steps (default: tuned for the host)
+            job_store: Store to checkpoint latents in, enables resuming (not
+                with multistep schedulers, whose solver history is not saved)
+            job_id: Job identifier used with `job_store`
+            checkpoint_every: Checkpoint the latents every this many steps
+            deadline: Interrupts denoising between steps once it has passed
+            num_keyframes: Generate only this many frames with diffusion and
+                interpolate the rest up to `num_frames` (None to diffuse all)
+            width: Animation width (multiple of 8)
+            height: Animation height (multiple of 8)
+            preempt: Once set, denoising checkpoints and stops between steps
+                so a more urgent job can use the device; rerun to resume
 
         Returns:
-            Tuple[str, bool]: (Path to output GIF, Success status)
+            Tuple[str, bool]: (Path to output GIF, Success status). With an
+            artifact writer the GIF may still be in progress, see
+            ArtifactWriter.future
         """
-        try:
-            # Setup pipeline if not already set up
-            if self.pipe is None:
-                self._setup_pipeline()
-
-            # Clear CUDA cache
-            torch.cuda.empty_cache()
-            gc.collect()
-
-            # Load and preprocess image
-            print("Loading input image...")
-            image = load_image(image_path)
-            image = image.resize((512, 512))
-
-            # Set default negative prompt if none provided
-            if negative_prompt is None:
-                negative_prompt = (
-                    "wrong white balance, dark, sketches, worst quality, low quality"
+        if num_inference_steps is None:
+            num_inference_steps = self.default_steps
+        start_step = 0
+
+        # One generation at a time: concurrent calls would share the
+        # pipeline's scheduler state and the VAE patched by the latent cache
+        with self.lock:
+            try:
+                # Setup pipeline if not already set up
+                self.load_pipeline()
+
+                # Clear CUDA cache
+                torch.cuda.empty_cache()
+                gc.collect()
+
+                # Load and preprocess image; its VAE encode may be cached
+                print("Loading input image...")
+                image = load_image(image_path)
+                latent_key = None
+                if self.latent_cache is not None:
+                    latent_key = LatentCache.make_key(
+                        image, (width, height), self.fit_mode
+                    )
+                image = fit_image(image, (width, height), self.fit_mode)
+
+                # Set default negative prompt if none provided
+                if negative_prompt is None:
+                    negative_prompt = "wrong white balance, dark, sketches, worst quality, low quality"
+
+                # Set up generator
+                generator = torch.Generator("cpu").manual_seed(seed)
+
+                # Diffuse a smaller keyframe set and synthesize the in-betweens
+                interpolating = (
+                    num_keyframes is not None and 1 < num_keyframes < num_frames
                 )
+                diffused_frames = num_keyframes if interpolating else num_frames
+
+                # Resume from the last latent checkpoint if there is one.
+                # Multistep solvers (DPM++, UniPC) keep a history of model
+                # outputs that a latent checkpoint does not capture, so their
+                # runs always start over.
+                scheduler = self.pipe.scheduler
+                resumable = not hasattr(scheduler, "model_outputs")
+                checkpointing = (
+                    job_store is not None and job_id is not None and resumable
+                )
+                if job_store is not None and job_id is not None and not resumable:
+                    print(
+                        f"{type(scheduler).__name__} cannot resume; not checkpointing"
+                    )
+                    job_store.clear_latents(job_id)
+                resume_kwargs = {}
+                resume_timesteps = None
+                if checkpointing:
+                    # Latents are only valid for the same schedule and frame count
+                    checkpoint_config = {
+                        "scheduler": f"{type(scheduler).__name__}"
+                        f":{scheduler.config.get('algorithm_type')}"
+                        f":{scheduler.config.get('use_karras_sigmas')}",
+                        "num_frames": diffused_frames,
+                    }
+                    checkpoint = job_store.load_latents(
+                        job_id,
+                        total_steps=num_inference_steps,
+                        shape=(
+                            1,
+                            self.pipe.vae.config.latent_channels,
+                            diffused_frames,
+                            height // self.pipe.vae_scale_factor,
+                            width // self.pipe.vae_scale_factor,
+                        ),
+                        config=checkpoint_config,
+                    )
+                    if checkpoint is not None:
+                        latents, step = checkpoint
+                        print(
+                            f"Resuming animation from step {step}/{num_inference_steps}"
+                        )
+                        start_step = step
+                        # The pipeline rescales given latents by init_noise_sigma
+                        # of the schedule it sets, so divide by that same value.
+                        # strength stays 1: below it the pipeline re-noises the
+                        # conditioning image and discards the given latents.
+                        scheduler.set_timesteps(num_inference_steps, device=self.device)
+                        resume_kwargs = {
+                            "latents": latents.to(self.device)
+                            / scheduler.init_noise_sigma
+                        }
+
+                        def resume_timesteps(
+                            num_inference_steps, timesteps, strength, device
+                        ):
+                            # Continue the full schedule after the completed steps
+                            begin = step * scheduler.order
+                            if hasattr(scheduler, "set_begin_index"):
+                                scheduler.set_begin_index(begin)
+                            return timesteps[begin:], num_inference_steps - step
+
+                def step_callback(pipe, step_index, timestep, callback_kwargs):
+                    completed = start_step + step_index + 1
+                    expired = deadline is not None and deadline.expired
+                    preempted = preempt is not None and preempt.is_set()
+                    interrupted = expired or preempted
+                    if (
+                        checkpointing
+                        and completed < num_inference_steps
+                        and (interrupted or completed % checkpoint_every == 0)
+                    ):
+                        job_store.save_latents(
+                            job_id,
+                            callback_kwargs["latents"],
+                            completed,
+                            num_inference_steps,
+                            checkpoint_config,
+                        )
+                    if expired:
+                        deadline.check(
+                            f"animation step {completed}/{num_inference_steps}"
+                        )
+                    if preempted:
+                        raise Preempted(
+                            f"Preempted at animation step {completed}/{num_inference_steps}"
+                        )
+                    return callback_kwargs
+
+                if checkpointing or deadline is not None or preempt is not None:
+                    resume_kwargs["callback_on_step_end"] = step_callback
+
+                if interpolating or self.postprocessor is not None:
+                    resume_kwargs["output_type"] = "np"
+
+                # Encode the prompts once; repeated prompts come from the cache
+                prompt_embeds = self._encode_text(prompt)
+                negative_prompt_embeds = self._encode_text(negative_prompt)
+
+                # Generate animation
+                print("Generating animation...")
+                if resume_timesteps is not None:
+                    self.pipe.get_timesteps = resume_timesteps
+                try:
+                    with self._cached_image_latents(latent_key):
+                        output = self.pipe(
+                            image=image,
+                            prompt_embeds=prompt_embeds,
+                            negative_prompt_embeds=negative_prompt_embeds,
+                            generator=generator,
+                            num_frames=diffused_frames,
+                            num_inference_steps=num_inference_steps,
+                            width=width,
+                            height=height,
+                            **resume_kwargs,
+                        )
+                finally:
+                    if resume_timesteps is not None:
+                        del self.pipe.get_timesteps
+
+                # Prepare output path
+                if output_filename is None:
+                    output_filename = f"animation_{seed}.gif"
+                output_path = os.path.join(self.output_dir, output_filename)
+
+                # Save the animation
+                frames = output.frames[0]
+                if self.artifact_writer is not None:
+                    future = self.artifact_writer.submit(
+                        output_path,
+                        lambda: self._encode_gif(frames, num_frames, num_keyframes),
+                    )
+                    if checkpointing:
+                        # Keep the checkpoint until the GIF is safely on disk
+                        def clear_checkpoint(written):
+                            if not written.cancelled() and written.exception() is None:
+                                job_store.clear_latents(job_id)
+
+                        future.add_done_callback(clear_checkpoint)
+                    print(f"Animation queued for writing to {output_path}")
+                    return output_path, True
+
+                atomic_write(
+                    output_path, self._encode_gif(frames, num_frames, num_keyframes)
+                )
+                print(f"Animation saved as {output_path}")
 
-            # Set up generator
-            generator = torch.Generator("cpu").manual_seed(seed)
-
-            # Generate animation
-            print("Generating animation...")
-            output = self.pipe(
-                image=image,
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                generator=generator,
-                num_frames=num_frames,
-            )
-
-            # Prepare output path
-            if output_filename is None:
-                output_filename = f"animation_{seed}.gif"
-            output_path = os.path.join(self.output_dir, output_filename)
-
-            # Save the animation
-            frames = output.frames[0]
-            export_to_gif(frames, output_path)
-            print(f"Animation saved as {output_path}")
+                if checkpointing:
+                    job_store.clear_latents(job_id)
 
-            return output_path, True
+                return output_path, True
 
-        except Exception as e:
-            print(f"Error during animation generation: {str(e)}")
-            return "", False
+            except Exception as e:
+                print(f"Error during animation generation: {str(e)}")
+                if start_step and not isinstance(e, (Preempted, DeadlineExceeded)):
+                    # Don't retry from a checkpoint the pipeline cannot resume
+                    job_store.clear_latents(job_id)
+                return "", False
 
-        finally:
-            self._cleanup()
+            finally:
+                self._cleanup()
 
 
 def test_animation_generator():
     """Test function for the AnimationGenerator class."""
-   # Create test directories
+    # Create test directories
     os.makedirs("pipeline_outputs/generated_images", exist_ok=True)
     os.makedirs("pipeline_outputs/animations", exist_ok=True)
     # Create a test image if it doesn't exist
     test_image_path = "./pipeline_outputs/generated_images/image_42_1.png"
 
-
     test_prompt = "an shinning Sun"
 
     # Create generator instance
     generator = AnimationGenerator(output_dir="./pipeline_outputs/animations")
 
-    
     # Generate test animation
     output_path, success = generator.generate_animation(
-        image_path=test_image_path, prompt=test_prompt, seed=42,num_frames=8
+        image_path=test_image_path, prompt=test_prompt, seed=42, num_frames=8
     )
 
     if success:
@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import torch
+from typing import Any, Dict, Optional, Tuple
+
+
+class JobStore:
+    def __init__(self, base_dir: str = "pipeline_outputs/jobs"):
+        """
+        Initialize the JobStore.
+
+        Each job gets its own directory holding a `state.json` with the
+        completed stage outputs (prompt, image path, ...) and, while an
+        animation is in progress, the latest latent checkpoint.
+
+        Args:
+            base_dir (str): Directory to keep job state in
+        """
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+
+    @staticmethod
+    def make_job_id(
+        entity: str, seed: int, tier: str = "standard", lesson: Optional[str] = None
+    ) -> str:
+        """
+        Build a filesystem-safe job id for an entity/seed/tier.
+
+        `lesson` identifies the lesson the entity belongs to, so the same
+        entity in another lesson gets its own job (and its own files).
+        """
+        safe_entity = re.sub(r"[^A-Za-z0-9_-]+", "_", entity.strip()).strip("_")
+        job_id = f"{safe_entity or 'entity'}_{seed}"
+        if tier != "standard":
+            job_id = f"{job_id}_{tier}"
+        if lesson is not None:
+            job_id = f"{job_id}_{hashlib.sha1(lesson.encode()).hexdigest()[:12]}"
+        return job_id
+
+    def job_dir(self, job_id: str) -> str:
+        path = os.path.join(self.base_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "state.json")
+
+    def _latents_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "latents.pt")
+
+    @staticmethod
+    def _tmp_path(path: str) -> str:
+        # Unique per writer, so concurrent writers never share a temp file
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def load_state(self, job_id: str) -> Dict[str, Any]:
+        """
+        Load the completed stage outputs of a job.
+
+        Returns:
+            Dict[str, Any]: Stage name -> output (empty for a new job)
+        """
+        path = self._state_path(job_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable job state {path}: {str(e)}")
+            return {}
+
+    def save_stage(self, job_id: str, stage: str, value: Any) -> None:
+        """Persist the output of a completed stage."""
+        state = self.load_state(job_id)
+        state[stage] = value
+        path = self._state_path(job_id)
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self, job_id: str) -> None:
+        """Forget every completed stage and the latent checkpoint of a job."""
+        for path in (self._state_path(job_id), self._latents_path(job_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def save_latents(
+        self,
+        job_id: str,
+        latents: torch.Tensor,
+        step: int,
+        total_steps: int,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Checkpoint the denoising latents of a job.
+
+        Args:
+            job_id: Job identifier
+            latents: Latents after `step` denoising steps
+            step: Number of completed denoising steps
+            total_steps: Total number of denoising steps of the run
+            config: Generation settings the latents are only valid for
+                (scheduler, frame count, ...), checked by load_latents
+        """
+        path = self._latents_path(job_id)
+        tmp_path = self._tmp_path(path)
+        torch.save(
+            {
+                "latents": latents.detach().to("cpu"),
+                "step": step,
+                "total_steps": total_steps,
+                "config": config or {},
+            },
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+
+    def load_latents(
+        self,
+        job_id: str,
+        total_steps: Optional[int] = None,
+        shape: Optional[Tuple[int, ...]] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Tuple[torch.Tensor, int]]:
+        """
+        Load the latest latent checkpoint of a job.
+
+        A checkpoint that does not match the given step count, latent shape
+        or config (e.g. after the scheduler or frame count changed) cannot
+        be resumed and is removed.
+
+        Returns:
+            Optional[Tuple[torch.Tensor, int]]: (latents, step), or None if the
+            job has no usable checkpoint
+        """
+        path = self._latents_path(job_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            checkpoint = torch.load(path, map_location="cpu")
+            latents, step = checkpoint["latents"], checkpoint["step"]
+            expected = {
+                "total_steps": (checkpoint["total_steps"], total_steps),
+                "shape": (tuple(latents.shape), tuple(shape) if shape else None),
+                "config": (checkpoint.get("config"), config),
+            }
+        except Exception as e:
+            print(f"Ignoring unreadable latent checkpoint {path}: {str(e)}")
+            self.clear_latents(job_id)
+            return None
+
+        for name, (stored, wanted) in expected.items():
+            if wanted is not None and stored != wanted:
+                print(f"Dropping latent checkpoint of {job_id}: {name} changed")
+                self.clear_latents(job_id)
+                return None
+        if not 0 < step < checkpoint["total_steps"]:
+            return None
+        return latents, step
+
+    def clear_latents(self, job_id: str) -> None:
+        """Remove the latent checkpoint once the animation is complete."""
+        path = self._latents_path(job_id)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+class LatentCache:
+    def __init__(self, cache_dir: str = "pipeline_outputs/latent_cache"):
+        """
+        Initialize the LatentCache.
+
+        Stores the VAE latent distribution of conditioning images as .npy
+        files that are memory-mapped on read, keyed by the image pixels and
+        the resolution it was encoded at.
+
+        Args:
+            cache_dir (str): Directory for the cached latents
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image: Image.Image, size: Tuple[int, int], fit_mode: str) -> str:
+        """
+        Cache key of a conditioning image.
+
+        Hashes the decoded pixels, so an image passed in memory and the
+        same image loaded back from its file share one key.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}{image.size}".encode())
+        digest.update(image.tobytes())
+        digest.update(f"|{size[0]}x{size[1]}|{fit_mode}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Memory-mapped cached latents, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            latents = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable cached latents {path}: {str(e)}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return latents
+
+    def put(self, key: str, latents: np.ndarray) -> None:
+        """Store latents; the file appears atomically."""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(latents))
+        os.replace(tmp_path, path)
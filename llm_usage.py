@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class UsageTracker:
+    def __init__(self):
+        """
+        Initialize the UsageTracker.
+
+        Records the token usage and latency of every chat completion, so the
+        cost of each call (and each lesson) can be inspected.
+        """
+        self._lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def usage_of(response: Any) -> Dict[str, int]:
+        """Token counts of a chat completion response."""
+        usage = getattr(response, "usage", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        }
+
+    def record(self, call: str, response: Any, elapsed: float) -> Dict[str, Any]:
+        """
+        Record one chat completion.
+
+        Args:
+            call: Name of the calling method (e.g. "extract_concepts")
+            response: The OpenAI chat completion response
+            elapsed: Wall time of the request in seconds
+
+        Returns:
+            Dict[str, Any]: The usage record
+        """
+        record = {"call": call, **self.usage_of(response), "latency_s": elapsed}
+        with self._lock:
+            self.records.append(record)
+        return record
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Number of calls, tokens and latency, totalled per call name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(
+                record["call"],
+                {
+                    "calls": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                    "latency_s": 0.0,
+                },
+            )
+            total["calls"] += 1
+            for field in (
+                "prompt_tokens",
+                "completion_tokens",
+                "total_tokens",
+                "latency_s",
+            ):
+                total[field] += record[field]
+        return totals
+
+
+def tracked_completion(
+    client: Any,
+    usage: UsageTracker,
+    call: str,
+    timeout: Optional[float] = None,
+    **kwargs
+) -> Any:
+    """
+    Create a chat completion and record its token usage under `call`.
+
+    Args:
+        client: The OpenAI client
+        usage: Tracker that receives the usage record
+        call: Name of the calling method (e.g. "extract_concepts")
+        timeout: Request timeout in seconds without retries, None for the
+            client default
+        **kwargs: Arguments of chat.completions.create
+
+    Returns:
+        The chat completion response
+    """
+    if timeout is not None:
+        client = client.with_options(timeout=timeout, max_retries=0)
+    started = time.perf_counter()
+    response = client.chat.completions.create(**kwargs)
+    usage.record(call, response, time.perf_counter() - started)
+    return response
@@ -19,8 +19,10 @@ def main():
     
     try:
         # Process interest and get results
-        user_interest = process_interest(explorer)
-        test_content = user_interest['focused_exploration']
+        # The basic exploration runs in the background while the focus is
+        # typed; the pipeline starts from the focused exploration if any
+        user_interest = process_interest(explorer, mode="concurrent")
+        test_content = user_interest['pipeline_input'][0]
 
         # Initialize the pipeline
         pipeline = EducationalAnimationPipeline()
@@ -0,0 +1,193 @@
+import io
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from artifact_writer import atomic_write
+from image_backends import ImageBackend
+from schedulers import DEFAULT_STEPS
+
+
+class MockExplorer:
+    def __init__(self, delay: float = 0.2):
+        """Offline stand-in for InterestExplorer that returns canned text."""
+        self.delay = delay
+
+    def generate_with_focus(
+        self, interest: str, focus_aspect: str, timeout: Optional[float] = None
+    ) -> str:
+        time.sleep(self.delay)
+        return (
+            f"{interest} is full of surprises. Looking at {focus_aspect}, we can see "
+            f"how Planets, Comets and Crystals all follow the same simple rules. "
+            f"What else about {interest} could you discover?"
+        )
+
+    def generate_lesson_plan(
+        self,
+        interest: str,
+        focus_aspect: str,
+        max_entities: int = 4,
+        word_count: int = 250,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        exploration = self.generate_with_focus(interest, focus_aspect, timeout)
+        entities = MockEntityExtractor(delay=0).extract_concepts(exploration)
+        return {
+            "focused_exploration": exploration,
+            "entities": [
+                {
+                    "name": name,
+                    "prompt": MockPromptEnricher(delay=0).enrich_prompt(name),
+                }
+                for name in entities[:max_entities]
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+
+class MockEntityExtractor:
+    def __init__(self, delay: float = 0.1, max_entities: int = 3):
+        """Offline stand-in for EntityExtractor: picks capitalized words mid-sentence."""
+        self.delay = delay
+        self.max_entities = max_entities
+
+    def extract_concepts(self, text: str, timeout: Optional[float] = None) -> List[str]:
+        time.sleep(self.delay)
+        entities = []
+        for word in re.findall(r"(?<=[a-z,] )[A-Z][a-z]{3,}\b", text):
+            if word not in entities:
+                entities.append(word)
+        return entities[: self.max_entities] or ["Sun"]
+
+
+class MockPromptEnricher:
+    def __init__(self, delay: float = 0.1):
+        """Offline stand-in for PromptEnricher."""
+        self.delay = delay
+
+    def enrich_prompt(self, entity: str, timeout: Optional[float] = None) -> str:
+        time.sleep(self.delay)
+        return f"show me {entity}, colorful educational illustration, highly detailed, realistic"
+
+
+def _mock_image(seed: int, width: int, height: int) -> Image.Image:
+    """Deterministic gradient with a disc, different per seed."""
+    rng = np.random.default_rng(seed)
+    top, bottom = rng.integers(0, 256, size=(2, 3))
+    ramp = np.linspace(0.0, 1.0, height)[:, None, None]
+    pixels = np.broadcast_to(top + (bottom - top) * ramp, (height, width, 3)).copy()
+    yy, xx = np.mgrid[:height, :width]
+    radius = min(width, height) / 4
+    disc = (xx - width / 2) ** 2 + (yy - height / 2) ** 2 < radius**2
+    pixels[disc] = 255 - top
+    return Image.fromarray(pixels.astype(np.uint8))
+
+
+class MockImageBackend(ImageBackend):
+    expected_latency = 0.5
+
+    def __init__(self, delay: float = 0.5):
+        """Offline image backend that draws a placeholder image."""
+        self.delay = delay
+
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        width: int,
+        height: int,
+        quality: str = "standard",
+        output_dir: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        time.sleep(self.delay)
+        image = _mock_image(seed, width, height)
+        path = None
+        if output_dir is not None:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            path = f"{output_dir}/image_{filename_prefix or seed}_1.png"
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            atomic_write(path, buffer.getvalue())
+        return [(path, image)]
+
+
+class MockAnimationGenerator:
+    def __init__(self, output_dir: str = "outputs", delay: float = 2.0):
+        """Offline stand-in for AnimationGenerator: pans the input image."""
+        self.output_dir = output_dir
+        self.delay = delay
+        self.default_steps = DEFAULT_STEPS
+        os.makedirs(output_dir, exist_ok=True)
+
+    def generate_animation(
+        self,
+        image_path,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        seed: int = 0,
+        num_frames: int = 16,
+        output_filename: Optional[str] = None,
+        width: int = 512,
+        height: int = 512,
+        deadline=None,
+        preempt=None,
+        **kwargs,
+    ) -> Tuple[str, bool]:
+        # Sleep in slices so deadlines and preemption interrupt it like
+        # denoising steps would
+        for _ in range(10):
+            if deadline is not None and deadline.expired:
+                return "", False
+            if preempt is not None and preempt.is_set():
+                return "", False
+            time.sleep(self.delay / 10)
+
+        image = (
+            image_path
+            if isinstance(image_path, Image.Image)
+            else Image.open(image_path)
+        )
+        pixels = np.asarray(image.convert("RGB").resize((width, height)))
+        frames = [
+            Image.fromarray(np.roll(pixels, i * width // num_frames, axis=1))
+            for i in range(num_frames)
+        ]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer,
+            format="GIF",
+            save_all=True,
+            append_images=frames[1:],
+            duration=100,
+            loop=0,
+        )
+        output_path = os.path.join(
+            self.output_dir, output_filename or f"animation_{seed}.gif"
+        )
+        atomic_write(output_path, buffer.getvalue())
+        return output_path, True
+
+
+def mock_components(output_base_dir: str, delay: float = 1.0) -> Dict:
+    """
+    Keyword arguments for EducationalAnimationPipeline that replace every
+    external service and model with an offline mock.
+
+    `delay` scales the simulated latencies (animation takes 2 * delay).
+    """
+    return {
+        "explorer": MockExplorer(delay=0.2 * delay),
+        "entity_extractor": MockEntityExtractor(delay=0.1 * delay),
+        "prompt_enricher": MockPromptEnricher(delay=0.1 * delay),
+        "image_backend": MockImageBackend(delay=0.5 * delay),
+        "animation_generator": MockAnimationGenerator(
+            output_dir=os.path.join(output_base_dir, "animations"), delay=2.0 * delay
+        ),
+    }
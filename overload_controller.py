@@ -0,0 +1,201 @@
+import threading
+from types import SimpleNamespace
+from typing import Dict, List
+
+from priority_scheduler import PRIORITIES, PriorityScheduler
+
+# Stage queue -> Deadline budget its latency target is taken from
+STAGE_BUDGETS = {"llm": "exploration", "image": "image", "animation": "animation"}
+
+
+class OverloadController:
+    def __init__(
+        self,
+        scheduler: PriorityScheduler,
+        latency_targets: Dict[str, float],
+        reduced_entities: int = 2,
+        smoothing: float = 0.3,
+        recovery: float = 0.7,
+    ):
+        """
+        Initialize the OverloadController.
+
+        Estimates the queueing delay of each stage from its queue depth and
+        an exponentially weighted moving average of its service time, and
+        turns it into a degradation plan for new lessons:
+
+        - animation wait above half its target: cap the entities per lesson
+        - animation wait above its target: still images only, no animation
+        - LLM or image wait above its target: answer from the cache only
+
+        Each priority level sees only the waits ahead of it and has its own
+        modes. A mode switches off again once the wait is below `recovery`
+        times the threshold that switched it on, so plans do not flap.
+        Prefetch requests are shed (cached only) as soon as any of their
+        modes is on; batch requests are never degraded since they already
+        yield by priority.
+
+        Args:
+            scheduler: The pipeline's stage queues
+            latency_targets: Acceptable queueing delay per stage in seconds
+            reduced_entities: Entities per lesson while capped
+            smoothing: EWMA weight of the newest service time
+            recovery: Fraction of a threshold below which a mode switches off
+        """
+        self.scheduler = scheduler
+        self.latency_targets = latency_targets
+        self.reduced_entities = reduced_entities
+        self.smoothing = smoothing
+        self.recovery = recovery
+        self.latency: Dict[str, float] = {}
+        modes = ("cap_entities", "still_only", "cached_only")
+        # Priority -> mode -> on
+        self.active: Dict[str, Dict[str, bool]] = {
+            priority: {mode: False for mode in modes}
+            for priority in ("interactive", "prefetch")
+        }
+        self.degraded_counts: Dict[str, int] = {mode: 0 for mode in modes}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the service time of one job of `stage`."""
+        with self._lock:
+            previous = self.latency.get(stage)
+            self.latency[stage] = (
+                seconds
+                if previous is None
+                else self.smoothing * seconds + (1 - self.smoothing) * previous
+            )
+
+    def estimated_wait(self, stage: str, priority: str = "interactive") -> float:
+        """
+        Expected queueing delay of a new `priority` job of `stage` in seconds.
+
+        Only waiting jobs at least as urgent count, since the queue lets the
+        new job overtake the rest.
+        """
+        level = PriorityScheduler.priority_of(priority)
+        queue = self.scheduler.queues[stage]
+        ahead = sum(1 for request in queue.waiting if request.priority <= level)
+        return ahead / max(1, queue.slots) * self.latency.get(stage, 0.0)
+
+    def _update(
+        self, active: Dict[str, bool], mode: str, wait: float, threshold: float
+    ) -> bool:
+        active[mode] = wait > threshold * (self.recovery if active[mode] else 1.0)
+        return active[mode]
+
+    def plan(self, priority: str = "interactive") -> Dict:
+        """
+        Degradation plan for a new lesson of `priority`.
+
+        Returns:
+            Dict: {"max_entities": Optional[int], "still_only": bool,
+            "cached_only": bool, "reasons": List[str]}
+        """
+        reasons: List[str] = []
+        plan = {"max_entities": None, "still_only": False, "cached_only": False}
+        if PriorityScheduler.priority_of(priority) >= PRIORITIES["batch"]:
+            plan["reasons"] = reasons
+            return plan
+        waits = {
+            stage: self.estimated_wait(stage, priority)
+            for stage in self.latency_targets
+        }
+
+        with self._lock:
+            active = self.active[priority]
+            animation_target = self.latency_targets.get("animation")
+            if animation_target is not None:
+                # The pipeline records a reason only if entities are actually dropped
+                if self._update(
+                    active, "cap_entities", waits["animation"], animation_target / 2
+                ):
+                    plan["max_entities"] = self.reduced_entities
+                if self._update(
+                    active, "still_only", waits["animation"], animation_target
+                ):
+                    plan["still_only"] = True
+                    reasons.append(
+                        f"still images only: animation queue wait ~{waits['animation']:.0f}s "
+                        f"(target {animation_target:.0f}s)"
+                    )
+
+            congested = [
+                stage
+                for stage in ("llm", "image")
+                if stage in self.latency_targets
+                and waits[stage]
+                > self.latency_targets[stage]
+                * (self.recovery if active["cached_only"] else 1.0)
+            ]
+            active["cached_only"] = bool(congested)
+            for stage in congested:
+                plan["cached_only"] = True
+                reasons.append(
+                    f"cached only: {stage} queue wait ~{waits[stage]:.0f}s "
+                    f"(target {self.latency_targets[stage]:.0f}s)"
+                )
+
+            if (
+                priority == "prefetch"
+                and any(active.values())
+                and not plan["cached_only"]
+            ):
+                plan["cached_only"] = True
+                reasons.append("cached only: prefetch is shed under load")
+
+            for mode in ("cached_only", "still_only"):
+                if plan[mode]:
+                    self.degraded_counts[mode] += 1
+            if plan["max_entities"] is not None:
+                self.degraded_counts["cap_entities"] += 1
+
+        plan["reasons"] = reasons
+        return plan
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "latency": dict(self.latency),
+                "estimated_wait": {
+                    stage: self.estimated_wait(stage) for stage in self.latency_targets
+                },
+                "active": {
+                    priority: dict(modes) for priority, modes in self.active.items()
+                },
+                "degraded": dict(self.degraded_counts),
+            }
+
+
+def test_overload_controller():
+    """Degradation modes switch on under load and off again with hysteresis."""
+    scheduler = PriorityScheduler(slots={"llm": 2, "image": 2, "animation": 1})
+    controller = OverloadController(
+        scheduler, latency_targets={"llm": 30.0, "image": 45.0, "animation": 300.0}
+    )
+    controller.observe("animation", 100.0)
+    controller.observe("llm", 2.0)
+
+    def load(stage: str, waiting: int, priority: int = 0) -> None:
+        scheduler.queues[stage].waiting = [SimpleNamespace(priority=priority)] * waiting
+
+    print("idle:", controller.plan())
+    load("animation", 2)
+    print("animation backlog 2:", controller.plan())
+    load("animation", 4)
+    print("animation backlog 4:", controller.plan())
+    print("prefetch:", controller.plan("prefetch"))
+    print("batch:", controller.plan("batch"))
+    load("animation", 3)
+    print("animation backlog 3 (hysteresis):", controller.plan())
+    load("animation", 10, priority=2)
+    print("batch animation backlog 10:", controller.plan())
+    load("animation", 0)
+    load("llm", 40)
+    print("llm backlog 40:", controller.plan())
+    print(controller.stats())
+
+
+if __name__ == "__main__":
+    test_overload_controller()
@@ -0,0 +1,247 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+
+# Lower is more urgent
+PRIORITIES = {"interactive": 0, "prefetch": 1, "batch": 2}
+
+DEFAULT_STAGE_SLOTS = {"llm": 3, "image": 3, "animation": 3}
+
+
+class Preempted(Exception):
+    """Raised when a running job gave up its slot to a more urgent one."""
+
+
+class StageSlot:
+    def __init__(self, stage: str, priority: int, tenant: str, waited: float):
+        """A granted slot of a stage queue."""
+        self.stage = stage
+        self.priority = priority
+        self.tenant = tenant
+        self.waited = waited
+        # Set from the event loop, polled by the worker thread between steps
+        self.preempt = threading.Event()
+
+    @property
+    def preempted(self) -> bool:
+        return self.preempt.is_set()
+
+
+class _Request:
+    def __init__(
+        self, priority: int, tenant: str, start_tag: float, future: asyncio.Future
+    ):
+        self.priority = priority
+        self.tenant = tenant
+        self.start_tag = start_tag
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class StageQueue:
+    def __init__(
+        self,
+        stage: str,
+        slots: int,
+        weights: Optional[Dict[str, float]] = None,
+        aging: float = 30.0,
+        preemptible: bool = False,
+    ):
+        """
+        Initialize the StageQueue.
+
+        Waiting requests are granted in order of priority, with every
+        `aging` seconds of waiting promoting a request by one level so
+        background work is never starved. Requests of the same
+        effective priority are interleaved across tenants (devices or
+        classrooms) by start-time fair queuing with the given weights.
+
+        Args:
+            stage (str): Stage name, for slots and stats
+            slots (int): Jobs that may run in the stage at once
+            weights (Dict[str, float]): Fair-share weight per tenant (default 1)
+            aging (float): Seconds of waiting that promote a request by one level
+            preemptible (bool): Ask the least urgent running job to give up its
+                slot when a more urgent request has to wait
+        """
+        self.stage = stage
+        self.slots = slots
+        self.weights = weights or {}
+        self.aging = aging
+        self.preemptible = preemptible
+        self.running: List[StageSlot] = []
+        self.waiting: List[_Request] = []
+        self.virtual_time = 0.0
+        self.tenant_finish: Dict[str, float] = {}
+        self.preemptions = 0
+
+    def _effective_priority(self, request: _Request, now: float) -> int:
+        return request.priority - int((now - request.enqueued) // self.aging)
+
+    def _dispatch(self) -> None:
+        while len(self.running) < self.slots and self.waiting:
+            now = time.monotonic()
+            request = min(
+                self.waiting,
+                key=lambda r: (self._effective_priority(r, now), r.start_tag),
+            )
+            self.waiting.remove(request)
+            self.virtual_time = max(self.virtual_time, request.start_tag)
+            slot = StageSlot(
+                self.stage, request.priority, request.tenant, now - request.enqueued
+            )
+            self.running.append(slot)
+            request.future.set_result(slot)
+
+    def _preempt_for(self, priority: int) -> None:
+        """Signal the least urgent running job that is less urgent than `priority`."""
+        # Called once per waiting request, so each preempts at most one job
+        victims = [s for s in self.running if s.priority > priority and not s.preempted]
+        if victims:
+            victim = max(victims, key=lambda s: s.priority)
+            print(
+                f"Preempting {victim.stage} job of {victim.tenant} for a more urgent request"
+            )
+            victim.preempt.set()
+            self.preemptions += 1
+
+    async def acquire(self, priority: int, tenant: str) -> StageSlot:
+        """Wait for a slot of this stage."""
+        start_tag = max(self.virtual_time, self.tenant_finish.get(tenant, 0.0))
+        self.tenant_finish[tenant] = start_tag + 1.0 / self.weights.get(tenant, 1.0)
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(_Request(priority, tenant, start_tag, future))
+        self._dispatch()
+        if not future.done() and self.preemptible:
+            self._preempt_for(priority)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            else:
+                self.waiting = [r for r in self.waiting if r.future is not future]
+            raise
+
+    def release(self, slot: StageSlot) -> None:
+        if slot in self.running:
+            self.running.remove(slot)
+        self._dispatch()
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        slots: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        aging: float = 30.0,
+        preemptible: Iterable[str] = ("animation",),
+    ):
+        """
+        Initialize the PriorityScheduler.
+
+        Keeps one StageQueue per pipeline stage ("llm", "image",
+        "animation"), so interactive requests from the mirror overtake
+        prefetch and batch work at every stage.
+
+        Args:
+            slots: Concurrent jobs per stage, see DEFAULT_STAGE_SLOTS
+            weights: Fair-share weight per tenant (device or classroom)
+            aging: Seconds of waiting that promote a request by one priority level
+            preemptible: Stages whose running jobs can be preempted
+        """
+        self.slots = dict(DEFAULT_STAGE_SLOTS, **(slots or {}))
+        self.queues = {
+            stage: StageQueue(stage, count, weights, aging, stage in preemptible)
+            for stage, count in self.slots.items()
+        }
+
+    @staticmethod
+    def priority_of(priority: str) -> int:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        return PRIORITIES[priority]
+
+    async def acquire(
+        self, stage: str, priority: str = "interactive", tenant: str = "default"
+    ) -> StageSlot:
+        """Wait for a slot of `stage`; it is held until passed to release."""
+        return await self.queues[stage].acquire(self.priority_of(priority), tenant)
+
+    def release(self, slot: StageSlot) -> None:
+        self.queues[slot.stage].release(slot)
+
+    @asynccontextmanager
+    async def slot(
+        self, stage: str, priority: str = "interactive", tenant: str = "default"
+    ):
+        """Hold a slot of `stage` for the duration of the block."""
+        granted = await self.acquire(stage, priority, tenant)
+        try:
+            yield granted
+        finally:
+            self.release(granted)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            stage: {
+                "slots": queue.slots,
+                "running": len(queue.running),
+                "waiting": len(queue.waiting),
+                "preemptions": queue.preemptions,
+            }
+            for stage, queue in self.queues.items()
+        }
+
+
+def test_priority_scheduler():
+    """Interactive latency with and without priorities under batch load."""
+
+    async def simulate(prioritized: bool) -> List[float]:
+        scheduler = PriorityScheduler(slots={"animation": 2}, aging=30.0)
+        latencies = []
+
+        async def job(priority: str, tenant: str, seconds: float, record: bool):
+            started = time.monotonic()
+            steps = 10
+            # Simulated denoising steps; a preempted job requeues the rest
+            while steps:
+                async with scheduler.slot(
+                    "animation", priority if prioritized else "interactive", tenant
+                ) as slot:
+                    while steps and not slot.preempted:
+                        await asyncio.sleep(seconds / 10)
+                        steps -= 1
+            if record:
+                latencies.append(time.monotonic() - started)
+
+        rng = random.Random(0)
+        tasks = [
+            asyncio.ensure_future(job("batch", f"batch-{i % 2}", 0.2, False))
+            for i in range(40)
+        ]
+        for i in range(20):
+            await asyncio.sleep(rng.uniform(0.0, 0.1))
+            tasks.append(
+                asyncio.ensure_future(job("interactive", f"mirror-{i % 3}", 0.05, True))
+            )
+        await asyncio.gather(*tasks)
+        return latencies
+
+    def p95(values: List[float]) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    fifo = asyncio.run(simulate(prioritized=False))
+    prioritized = asyncio.run(simulate(prioritized=True))
+    print(f"Interactive p95 without priorities: {p95(fifo):.2f}s")
+    print(f"Interactive p95 with priorities:    {p95(prioritized):.2f}s")
+    assert p95(prioritized) < p95(fifo)
+
+
+if __name__ == "__main__":
+    test_priority_scheduler()
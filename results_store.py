@@ -0,0 +1,334 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from single_flight import lesson_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    interest TEXT NOT NULL,
+    interest_key TEXT NOT NULL,
+    focus_aspect TEXT,
+    tier TEXT,
+    lesson_key TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS explorations (
+    id INTEGER PRIMARY KEY,
+    lesson_id INTEGER NOT NULL REFERENCES lessons(id),
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    lesson_id INTEGER NOT NULL REFERENCES lessons(id),
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    description TEXT,
+    prompt TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL REFERENCES entities(id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_interest ON lessons(interest_key);
+CREATE INDEX IF NOT EXISTS idx_lessons_key ON lessons(lesson_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_explorations_lesson ON explorations(lesson_id);
+CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name_key);
+CREATE INDEX IF NOT EXISTS idx_entities_lesson ON entities(lesson_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_entity ON artifacts(entity_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS explorations_fts USING fts5(
+    text, content='explorations', content_rowid='id'
+);
+"""
+
+ARTIFACT_KINDS = {"image_path": "image", "animation_path": "animation"}
+
+
+class ResultsStore:
+    def __init__(self, db_path: str = "pipeline_outputs/results.db"):
+        """
+        Initialize the append-only results store.
+
+        Lessons, explorations, entities, prompts and artifact references are
+        kept in SQLite with indexes for lookups by interest and entity and a
+        full-text index over the explorations.
+
+        Args:
+            db_path (str): Path of the SQLite database file
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        # Full-text search needs FTS5, fall back to LIKE queries without it
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            print("SQLite FTS5 not available, search falls back to LIKE")
+            self.fts = False
+        self.conn.commit()
+
+    def record_lesson(self, lesson: Dict[str, Any]) -> int:
+        """Append a single lesson, see record_lessons."""
+        return self.record_lessons([lesson])[0]
+
+    def record_lessons(self, lessons: List[Dict[str, Any]]) -> List[int]:
+        """
+        Append a batch of lessons in one transaction.
+
+        Each lesson is a dict with `interest`, `focus_aspect`, `tier`,
+        optional `basic_exploration`/`focused_exploration` texts, optional
+        `entities` (dicts with name/description, as from potential_entities)
+        and optional `results` from EducationalAnimationPipeline.run_pipeline.
+
+        Returns:
+            List[int]: Ids of the recorded lessons
+        """
+        lesson_ids = []
+        now = time.time()
+        with self._lock, self.conn:
+            for lesson in lessons:
+                interest = lesson.get("interest", "")
+                focus_aspect = lesson.get("focus_aspect", "")
+                tier = lesson.get("tier", "standard")
+                cursor = self.conn.execute(
+                    "INSERT INTO lessons (interest, interest_key, focus_aspect, tier, lesson_key, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        interest,
+                        lesson_key(interest, "")[0],
+                        focus_aspect,
+                        tier,
+                        json.dumps(lesson_key(interest, focus_aspect, tier)),
+                        lesson.get("created_at", now),
+                    ),
+                )
+                lesson_id = cursor.lastrowid
+                lesson_ids.append(lesson_id)
+
+                for kind in ("basic", "focused"):
+                    text = lesson.get(f"{kind}_exploration")
+                    if text:
+                        cursor = self.conn.execute(
+                            "INSERT INTO explorations (lesson_id, kind, text) VALUES (?, ?, ?)",
+                            (lesson_id, kind, text),
+                        )
+                        if self.fts:
+                            self.conn.execute(
+                                "INSERT INTO explorations_fts (rowid, text) VALUES (?, ?)",
+                                (cursor.lastrowid, text),
+                            )
+
+                for entity in lesson.get("entities", []):
+                    if "name" in entity:
+                        self._insert_entity(lesson_id, entity["name"], entity, now)
+                for result in lesson.get("results", []):
+                    if "entity" in result:
+                        self._insert_entity(lesson_id, result["entity"], result, now)
+        return lesson_ids
+
+    def _insert_entity(
+        self, lesson_id: int, name: str, record: Dict[str, Any], now: float
+    ) -> None:
+        cursor = self.conn.execute(
+            "INSERT INTO entities (lesson_id, name, name_key, description, prompt, error)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                lesson_id,
+                name,
+                name.strip().lower(),
+                record.get("description"),
+                record.get("prompt"),
+                record.get("error"),
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO artifacts (entity_id, kind, path, created_at) VALUES (?, ?, ?, ?)",
+            [
+                (cursor.lastrowid, kind, record[field], now)
+                for field, kind in ARTIFACT_KINDS.items()
+                if record.get(field)
+            ],
+        )
+
+    def _load_lessons(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Assemble lesson dicts (with explorations and results) from lesson rows."""
+        lessons = []
+        for row in rows:
+            lesson = {
+                "id": row["id"],
+                "interest": row["interest"],
+                "focus_aspect": row["focus_aspect"],
+                "tier": row["tier"],
+                "created_at": row["created_at"],
+            }
+            for exploration in self.conn.execute(
+                "SELECT kind, text FROM explorations WHERE lesson_id = ?", (row["id"],)
+            ):
+                lesson[f"{exploration['kind']}_exploration"] = exploration["text"]
+            lesson["results"] = [
+                self._entity_result(entity)
+                for entity in self.conn.execute(
+                    "SELECT * FROM entities WHERE lesson_id = ? ORDER BY id",
+                    (row["id"],),
+                )
+            ]
+            lessons.append(lesson)
+        return lessons
+
+    def _entity_result(self, entity: sqlite3.Row) -> Dict[str, Any]:
+        result = {"entity": entity["name"]}
+        for field in ("description", "prompt", "error"):
+            if entity[field] is not None:
+                result[field] = entity[field]
+        for artifact in self.conn.execute(
+            "SELECT kind, path FROM artifacts WHERE entity_id = ? ORDER BY id",
+            (entity["id"],),
+        ):
+            result[f"{artifact['kind']}_path"] = artifact["path"]
+        return result
+
+    def get_lesson(self, lesson_id: int) -> Optional[Dict[str, Any]]:
+        """Stored lesson by id, if any."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM lessons WHERE id = ?", (lesson_id,)
+            ).fetchall()
+            lessons = self._load_lessons(rows)
+        return lessons[0] if lessons else None
+
+    def find_by_interest(self, interest: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent lessons about `interest` (case-insensitive)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM lessons WHERE interest_key = ? ORDER BY created_at DESC LIMIT ?",
+                (lesson_key(interest, "")[0], limit),
+            ).fetchall()
+            return self._load_lessons(rows)
+
+    def find_lesson(
+        self, interest: str, focus_aspect: str, tier: str = "standard"
+    ) -> Optional[Dict[str, Any]]:
+        """Most recent lesson for a normalized (interest, focus, tier), if any."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM lessons WHERE lesson_key = ? ORDER BY created_at DESC LIMIT 1",
+                (json.dumps(lesson_key(interest, focus_aspect, tier)),),
+            ).fetchall()
+            lessons = self._load_lessons(rows)
+        return lessons[0] if lessons else None
+
+    def find_by_entity(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent results for an entity (case-insensitive), with their lesson."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT entities.*, lessons.interest, lessons.focus_aspect FROM entities"
+                " JOIN lessons ON lessons.id = entities.lesson_id"
+                " WHERE entities.name_key = ? ORDER BY entities.id DESC LIMIT ?",
+                (name.strip().lower(), limit),
+            ).fetchall()
+            results = []
+            for row in rows:
+                result = self._entity_result(row)
+                result["interest"] = row["interest"]
+                result["focus_aspect"] = row["focus_aspect"]
+                results.append(result)
+            return results
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over explorations; returns the matching lessons."""
+        with self._lock:
+            if self.fts:
+                rows = self.conn.execute(
+                    "SELECT DISTINCT lessons.* FROM explorations_fts"
+                    " JOIN explorations ON explorations.id = explorations_fts.rowid"
+                    " JOIN lessons ON lessons.id = explorations.lesson_id"
+                    " WHERE explorations_fts MATCH ? ORDER BY explorations_fts.rank LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT DISTINCT lessons.* FROM explorations"
+                    " JOIN lessons ON lessons.id = explorations.lesson_id"
+                    " WHERE explorations.text LIKE ? LIMIT ?",
+                    (f"%{query}%", limit),
+                ).fetchall()
+            return self._load_lessons(rows)
+
+    def import_csv(self, csv_path: str) -> List[int]:
+        """
+        Import a legacy exploration CSV (e.g. solar_system_results.csv).
+
+        The `entities` column holds the JSON-encoded potential_entities output.
+        """
+        lessons = []
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    entities = json.loads(row.get("entities") or "[]")
+                except ValueError:
+                    entities = []
+                lessons.append(
+                    {
+                        "interest": row.get("interest", ""),
+                        "focus_aspect": row.get("focus_aspect", ""),
+                        "basic_exploration": row.get("basic_exploration"),
+                        "focused_exploration": row.get("focused_exploration"),
+                        "entities": [e for e in entities if isinstance(e, dict)],
+                    }
+                )
+        return self.record_lessons(lessons)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def test_results_store():
+    """Test function for the ResultsStore class."""
+    store = ResultsStore(db_path=":memory:")
+    store.import_csv("solar_system_results.csv")
+    store.record_lesson(
+        {
+            "interest": "Space",
+            "focus_aspect": "the Sun",
+            "focused_exploration": "The Sun is our closest star.",
+            "results": [
+                {
+                    "entity": "Sun",
+                    "prompt": "show me the Sun with solar flares and corona",
+                    "image_path": "pipeline_outputs/generated_images/image_42_1.png",
+                    "animation_path": "pipeline_outputs/animations/animation_Sun_42.gif",
+                }
+            ],
+        }
+    )
+
+    print(f"Lessons about space: {len(store.find_by_interest('space'))}")
+    print(f"Results for Sun: {store.find_by_entity('sun')}")
+    print(f"Search 'galaxies': {[l['interest'] for l in store.search('galaxies')]}")
+    print(f"Cached lesson: {store.find_lesson('SPACE', 'the  sun') is not None}")
+
+
+if __name__ == "__main__":
+    test_results_store()
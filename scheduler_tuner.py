@@ -0,0 +1,259 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from image_to_animation import AnimationGenerator
+from schedulers import (
+    DEFAULT_SCHEDULER,
+    DEFAULT_STEPS,
+    DEFAULT_TUNING_PATH,
+    SCHEDULERS,
+    STOCHASTIC_SCHEDULERS,
+    make_scheduler,
+    save_tuned_config,
+)
+
+DEFAULT_STEP_COUNTS = [8, 12, 16, 20, 25, 30]
+
+
+def load_gif_frames(path: str, size: int = 64) -> np.ndarray:
+    """Frames of a GIF as downsampled grayscale floats, shape (F, size, size)."""
+    with Image.open(path) as gif:
+        frames = [
+            np.asarray(frame.convert("L").resize((size, size), Image.BILINEAR))
+            for frame in ImageSequence.Iterator(gif)
+        ]
+    return np.stack(frames).astype(np.float32)
+
+
+def psnr(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Peak signal-to-noise ratio in dB over the frames both clips have."""
+    count = min(len(reference), len(candidate))
+    mse = float(np.mean((reference[:count] - candidate[:count]) ** 2))
+    return float("inf") if mse == 0 else 10 * np.log10(255.0**2 / mse)
+
+
+def pareto_front(results: List[Dict]) -> List[Dict]:
+    """Configurations no other configuration beats on both time and quality."""
+    front = []
+    for result in sorted(results, key=lambda r: (r["seconds"], -r["psnr"])):
+        if not front or result["psnr"] > front[-1]["psnr"]:
+            front.append(result)
+    return front
+
+
+def select_config(results: List[Dict], min_psnr: float) -> Optional[Dict]:
+    """Fastest Pareto-optimal configuration whose quality is acceptable."""
+    acceptable = [r for r in pareto_front(results) if r["psnr"] >= min_psnr]
+    return acceptable[0] if acceptable else None
+
+
+class SchedulerTuner:
+    def __init__(
+        self,
+        image_paths: List[str],
+        output_dir: str = "pipeline_outputs/scheduler_tuning",
+        prompt: str = "gentle natural motion, high quality",
+        num_frames: int = 8,
+        width: int = 384,
+        height: int = 384,
+        seed: int = 42,
+    ):
+        """
+        Initialize the SchedulerTuner.
+
+        Animates every reference image once with the untuned default
+        (Euler, 50 steps) and then with each scheduler/step-count pair,
+        scoring each clip by its PSNR against the reference clip of the same
+        image on downsampled grayscale frames.
+
+        Args:
+            image_paths: Conditioning images to benchmark on
+            output_dir: Directory for the benchmark animations
+            prompt: Animation prompt used for every image
+            num_frames: Frames per benchmark animation
+            width: Benchmark animation width
+            height: Benchmark animation height
+            seed: Seed shared by all runs so only the scheduler differs
+        """
+        self.image_paths = image_paths
+        self.output_dir = output_dir
+        self.prompt = prompt
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        self.seed = seed
+        # Raw frames and no tuning, so the default is the reference
+        self.generator = AnimationGenerator(
+            output_dir=output_dir, keep_loaded=True, tuning_path=None
+        )
+        self.base_config = None
+        self.references: Dict[str, np.ndarray] = {}
+
+    def _animate(self, image_path: str, scheduler: str, steps: int) -> Optional[float]:
+        """Animate one image with a configuration; returns the wall time."""
+        pipe = self.generator.load_pipeline()
+        if self.base_config is None:
+            self.base_config = dict(pipe.scheduler.config)
+        pipe.scheduler = make_scheduler(scheduler, self.base_config)
+
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        started = time.perf_counter()
+        _, success = self.generator.generate_animation(
+            image_path=image_path,
+            prompt=self.prompt,
+            seed=self.seed,
+            num_frames=self.num_frames,
+            output_filename=f"{name}_{scheduler}_{steps}.gif",
+            num_inference_steps=steps,
+            width=self.width,
+            height=self.height,
+        )
+        return time.perf_counter() - started if success else None
+
+    def _frames(self, image_path: str, scheduler: str, steps: int) -> np.ndarray:
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        return load_gif_frames(
+            os.path.join(self.output_dir, f"{name}_{scheduler}_{steps}.gif")
+        )
+
+    def run(self, schedulers: List[str], step_counts: List[int]) -> List[Dict]:
+        """
+        Benchmark every scheduler/step-count pair.
+
+        Returns:
+            List[Dict]: {scheduler, num_inference_steps, seconds, psnr} per
+            configuration that succeeded on every image, with `seconds` the
+            mean wall time and `psnr` the mean PSNR
+        """
+        for image_path in self.image_paths:
+            print(f"Rendering reference for {image_path}...")
+            if self._animate(image_path, DEFAULT_SCHEDULER, DEFAULT_STEPS) is None:
+                print(f"Skipping {image_path}: reference animation failed")
+                continue
+            self.references[image_path] = self._frames(
+                image_path, DEFAULT_SCHEDULER, DEFAULT_STEPS
+            )
+        if not self.references:
+            raise Exception("No reference animations could be rendered")
+
+        results = []
+        for scheduler in schedulers:
+            for steps in step_counts:
+                times, scores = [], []
+                for image_path, reference in self.references.items():
+                    seconds = self._animate(image_path, scheduler, steps)
+                    if seconds is None:
+                        break
+                    times.append(seconds)
+                    scores.append(
+                        psnr(reference, self._frames(image_path, scheduler, steps))
+                    )
+                if len(times) < len(self.references):
+                    print(f"{scheduler} @ {steps} steps failed, skipping")
+                    continue
+                result = {
+                    "scheduler": scheduler,
+                    "num_inference_steps": steps,
+                    "seconds": sum(times) / len(times),
+                    "psnr": sum(scores) / len(scores),
+                }
+                print(
+                    f"{scheduler} @ {steps} steps: {result['seconds']:.1f}s, "
+                    f"{result['psnr']:.1f} dB"
+                )
+                results.append(result)
+        return results
+
+
+def print_results(results: List[Dict]) -> None:
+    front = pareto_front(results)
+    print(f"\n{'scheduler':<18}{'steps':>7}{'seconds':>10}{'psnr dB':>10}  pareto")
+    for result in sorted(results, key=lambda r: r["seconds"]):
+        print(
+            f"{result['scheduler']:<18}{result['num_inference_steps']:>7}"
+            f"{result['seconds']:>10.1f}{result['psnr']:>10.1f}"
+            f"  {'*' if result in front else ''}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pick the fastest acceptable animation scheduler for this host."
+    )
+    parser.add_argument(
+        "--images",
+        default="pipeline_outputs/generated_images/*.png",
+        help="Glob of reference conditioning images",
+    )
+    parser.add_argument(
+        "--schedulers",
+        nargs="+",
+        default=[name for name in SCHEDULERS if name not in STOCHASTIC_SCHEDULERS],
+        choices=list(SCHEDULERS),
+        help="Schedulers to try; the stochastic ones (euler_a, dpmpp_sde) score "
+        "low against the fixed-seed reference whatever their quality",
+    )
+    parser.add_argument("--steps", nargs="+", type=int, default=DEFAULT_STEP_COUNTS)
+    parser.add_argument(
+        "--include-lcm",
+        action="store_true",
+        help="Also try LCM (only for LCM-distilled weights)",
+    )
+    parser.add_argument(
+        "--min-psnr", type=float, default=25.0, help="Quality floor in dB"
+    )
+    parser.add_argument("--num-frames", type=int, default=8)
+    parser.add_argument(
+        "--size", type=int, default=384, help="Benchmark width and height"
+    )
+    parser.add_argument("--output-dir", default="pipeline_outputs/scheduler_tuning")
+    parser.add_argument("--tuning-path", default=DEFAULT_TUNING_PATH)
+    parser.add_argument("--report", default=None, help="Write all results as JSON here")
+    args = parser.parse_args()
+
+    image_paths = sorted(glob.glob(args.images))
+    if not image_paths:
+        parser.error(f"No images match {args.images}")
+    schedulers = list(args.schedulers)
+    if args.include_lcm and "lcm" not in schedulers:
+        schedulers.append("lcm")
+    for name in schedulers:
+        if name in STOCHASTIC_SCHEDULERS:
+            print(
+                f"Note: {name} adds noise at every step; its PSNR understates its quality"
+            )
+
+    tuner = SchedulerTuner(
+        image_paths,
+        output_dir=args.output_dir,
+        num_frames=args.num_frames,
+        width=args.size,
+        height=args.size,
+    )
+    results = tuner.run(schedulers, args.steps)
+    print_results(results)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+
+    chosen = select_config(results, args.min_psnr)
+    if chosen is None:
+        print(f"\nNo configuration reaches {args.min_psnr} dB; keeping the defaults")
+        return
+    save_tuned_config(chosen, args.tuning_path)
+    print(
+        f"\nSaved {chosen['scheduler']} @ {chosen['num_inference_steps']} steps "
+        f"for {socket.gethostname()} to {args.tuning_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import json
+import os
+import socket
+from typing import Any, Dict, Optional
+
+from diffusers import (
+    DPMSolverMultistepScheduler,
+    EulerAncestralDiscreteScheduler,
+    EulerDiscreteScheduler,
+    LCMScheduler,
+    UniPCMultistepScheduler,
+)
+
+# Scheduler name -> (class, extra config)
+SCHEDULERS = {
+    "euler": (EulerDiscreteScheduler, {}),
+    "euler_a": (EulerAncestralDiscreteScheduler, {}),
+    "dpmpp_2m": (DPMSolverMultistepScheduler, {"algorithm_type": "dpmsolver++"}),
+    "dpmpp_2m_karras": (
+        DPMSolverMultistepScheduler,
+        {"algorithm_type": "dpmsolver++", "use_karras_sigmas": True},
+    ),
+    "dpmpp_sde": (DPMSolverMultistepScheduler, {"algorithm_type": "sde-dpmsolver++"}),
+    "unipc": (UniPCMultistepScheduler, {}),
+    # Only meaningful with LCM-distilled weights (e.g. an LCM LoRA)
+    "lcm": (LCMScheduler, {}),
+}
+
+# Samplers that inject fresh noise at every step, so their output never
+# matches a fixed-seed reference however good it is
+STOCHASTIC_SCHEDULERS = ("euler_a", "dpmpp_sde", "lcm")
+
+DEFAULT_SCHEDULER = "euler"
+DEFAULT_STEPS = 50
+DEFAULT_TUNING_PATH = "scheduler_tuning.json"
+
+
+def make_scheduler(name: str, base_config: Dict[str, Any]):
+    """Build scheduler `name` from the pipeline's scheduler config."""
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}")
+    scheduler_class, extra_config = SCHEDULERS[name]
+    return scheduler_class.from_config(base_config, **extra_config)
+
+
+def load_tuned_config(
+    path: str = DEFAULT_TUNING_PATH, host: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Tuned {scheduler, num_inference_steps, ...} for this host, if any."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            tuning = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable scheduler tuning {path}: {str(e)}")
+        return None
+    config = tuning.get(host or socket.gethostname())
+    if not config or config.get("scheduler") not in SCHEDULERS:
+        return None
+    return config
+
+
+def save_tuned_config(
+    config: Dict[str, Any], path: str = DEFAULT_TUNING_PATH, host: Optional[str] = None
+) -> None:
+    """Persist the tuned configuration of this host, keeping other hosts'."""
+    tuning = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            tuning = json.load(f)
+    tuning[host or socket.gethostname()] = config
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from EducationalAnimationPipeline import EducationalAnimationPipeline
+from image_to_animation import ANIMATION_TIERS
+from priority_scheduler import PRIORITIES
+from single_flight import lesson_key
+
+# Load environment variables
+load_dotenv()
+
+PATH_KEYS = ("image_path", "animation_path")
+
+
+class LessonJob:
+    def __init__(
+        self,
+        job_id: str,
+        interest: str,
+        focus_aspect: str,
+        tier: str,
+        priority: str = "interactive",
+        device: str = "default",
+    ):
+        """A lesson being computed, with the progress events published so far."""
+        self.id = job_id
+        self.interest = interest
+        self.focus_aspect = focus_aspect
+        self.tier = tier
+        self.priority = priority
+        self.device = device
+        self.status = "running"
+        self.events: List[Dict] = []
+        self.lesson: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def publish(self, event: Dict) -> None:
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue that receives every event published from now on."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def snapshot(self) -> Dict:
+        snapshot = {
+            "id": self.id,
+            "status": self.status,
+            "interest": self.interest,
+            "focus_aspect": self.focus_aspect,
+            "tier": self.tier,
+            "events": len(self.events),
+        }
+        if self.lesson is not None:
+            snapshot["lesson"] = self.lesson
+        if self.error is not None:
+            snapshot["error"] = self.error
+        return snapshot
+
+
+class LessonServer:
+    def __init__(
+        self,
+        pipeline: EducationalAnimationPipeline,
+        cache_max_age: int = 3600,
+        cors_origin: Optional[str] = "*",
+        max_jobs: int = 256,
+    ):
+        """
+        Initialize the LessonServer.
+
+        Serves the pipeline to the front end: POST /lessons starts a lesson,
+        GET /lessons/{id} returns its state, /lessons/{id}/events streams its
+        progress over a WebSocket and /artifacts/... serves the generated
+        images and animations (with range requests and caching headers).
+
+        Args:
+            pipeline: Pipeline that computes the lessons
+            cache_max_age: Cache-Control max-age of artifacts in seconds
+            cors_origin: Access-Control-Allow-Origin value, None to disable CORS
+            max_jobs: Finished jobs kept in memory for GET /lessons/{id}
+        """
+        self.pipeline = pipeline
+        self.artifact_root = os.path.realpath(pipeline.output_base_dir)
+        self.cache_max_age = cache_max_age
+        self.cors_origin = cors_origin
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, LessonJob]" = OrderedDict()
+        self.in_flight: Dict[tuple, str] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._cors])
+        app.router.add_post("/lessons", self.create_lesson)
+        app.router.add_get("/lessons/{id}", self.get_lesson)
+        app.router.add_get("/lessons/{id}/events", self.lesson_events)
+        app.router.add_get("/artifacts/{path:.+}", self.artifact)
+        return app
+
+    @web.middleware
+    async def _cors(self, request: web.Request, handler):
+        if self.cors_origin is None:
+            return await handler(request)
+        if request.method == "OPTIONS":
+            response = web.Response()
+        else:
+            try:
+                response = await handler(request)
+            except web.HTTPException as e:
+                # Errors (400, 404, ...) must be readable cross-origin too
+                self._add_cors_headers(e.headers)
+                raise
+        if response.prepared:
+            # WebSocket responses have already sent their headers
+            return response
+        self._add_cors_headers(response.headers)
+        return response
+
+    def _add_cors_headers(self, headers) -> None:
+        headers["Access-Control-Allow-Origin"] = self.cors_origin
+        headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        headers["Access-Control-Allow-Headers"] = "Content-Type, Range"
+        headers["Access-Control-Expose-Headers"] = "Content-Range, Content-Length"
+
+    def artifact_url(self, path: str) -> Optional[str]:
+        """URL of an artifact under the pipeline's output directory."""
+        relative = os.path.relpath(os.path.realpath(path), self.artifact_root)
+        if relative.startswith(".."):
+            return None
+        return "/artifacts/" + relative.replace(os.sep, "/")
+
+    def _with_urls(self, value):
+        """Copy of an event or lesson with an `*_url` next to every artifact path."""
+        if isinstance(value, list):
+            return [self._with_urls(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        result = {key: self._with_urls(item) for key, item in value.items()}
+        for key in PATH_KEYS:
+            if result.get(key):
+                result[key.replace("_path", "_url")] = self.artifact_url(result[key])
+        return result
+
+    async def create_lesson(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(reason="Body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(reason="Body must be a JSON object")
+        interest = str(body.get("interest", "")).strip()
+        focus_aspect = str(body.get("focus_aspect", body.get("focus", ""))).strip()
+        tier = body.get("tier", "standard")
+        deadline_seconds = body.get("deadline_seconds")
+        priority = body.get("priority", "interactive")
+        device = str(body.get("device", "default"))
+        if not interest:
+            raise web.HTTPBadRequest(reason="interest is required")
+        if tier not in ANIMATION_TIERS:
+            raise web.HTTPBadRequest(reason=f"Unknown tier: {tier}")
+        if priority not in PRIORITIES:
+            raise web.HTTPBadRequest(reason=f"Unknown priority: {priority}")
+        if deadline_seconds is not None:
+            try:
+                deadline_seconds = float(deadline_seconds)
+            except (TypeError, ValueError):
+                raise web.HTTPBadRequest(reason="deadline_seconds must be a number")
+
+        # Repeated requests for a lesson in progress share its job
+        key = lesson_key(interest, focus_aspect, tier)
+        job_id = self.in_flight.get(key)
+        if job_id is None:
+            job = LessonJob(
+                uuid.uuid4().hex, interest, focus_aspect, tier, priority, device
+            )
+            self._add_job(job)
+            self.in_flight[key] = job.id
+            task = asyncio.ensure_future(self._run(job, key, deadline_seconds))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            job_id = job.id
+
+        return web.json_response(
+            {
+                "id": job_id,
+                "status_url": f"/lessons/{job_id}",
+                "events_url": f"/lessons/{job_id}/events",
+            },
+            status=202,
+        )
+
+    def _add_job(self, job: LessonJob) -> None:
+        self.jobs[job.id] = job
+        # Forget the oldest finished jobs; their lessons stay in the results store
+        for old_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[old_id].status != "running":
+                del self.jobs[old_id]
+
+    async def _run(
+        self, job: LessonJob, key: tuple, deadline_seconds: Optional[float]
+    ) -> None:
+        try:
+            lesson = await self.pipeline.run_lesson(
+                job.interest,
+                job.focus_aspect,
+                tier=job.tier,
+                deadline_seconds=deadline_seconds,
+                on_progress=lambda event: job.publish(self._with_urls(event)),
+                priority=job.priority,
+                tenant=job.device,
+            )
+            job.lesson = self._with_urls(lesson)
+            job.status = "done"
+            job.publish({"event": "lesson", "lesson": job.lesson})
+        except Exception as e:
+            print(f"Lesson {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            job.publish({"event": "error", "error": job.error})
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def get_lesson(self, request: web.Request) -> web.Response:
+        job_id = request.match_info["id"]
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return web.json_response(job.snapshot())
+        # Lessons from earlier runs are looked up by their results-store id
+        if job_id.isdigit():
+            lesson = self.pipeline.results_store.get_lesson(int(job_id))
+            if lesson is not None:
+                return web.json_response(
+                    {"id": job_id, "status": "done", "lesson": self._with_urls(lesson)}
+                )
+        raise web.HTTPNotFound(reason=f"Unknown lesson: {job_id}")
+
+    async def lesson_events(self, request: web.Request) -> web.WebSocketResponse:
+        job = self.jobs.get(request.match_info["id"])
+        if job is None:
+            raise web.HTTPNotFound(reason=f"Unknown lesson: {request.match_info['id']}")
+
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        # Replay what already happened, then follow live
+        backlog = list(job.events)
+        finished = job.status != "running"
+        queue = job.subscribe()
+
+        async def forward():
+            try:
+                for event in backlog:
+                    await ws.send_json(event)
+                while not finished:
+                    event = await queue.get()
+                    await ws.send_json(event)
+                    if event["event"] in ("lesson", "error"):
+                        break
+            finally:
+                await ws.close()
+
+        sender = asyncio.ensure_future(forward())
+        try:
+            # Client messages are ignored; this returns once the socket closes
+            async for _ in ws:
+                pass
+        finally:
+            sender.cancel()
+            job.unsubscribe(queue)
+        return ws
+
+    async def artifact(self, request: web.Request) -> web.StreamResponse:
+        path = os.path.realpath(
+            os.path.join(self.artifact_root, request.match_info["path"])
+        )
+        if not path.startswith(self.artifact_root + os.sep) or not os.path.isfile(path):
+            raise web.HTTPNotFound()
+        # FileResponse handles Range, ETag and If-Modified-Since itself
+        return web.FileResponse(
+            path, headers={"Cache-Control": f"public, max-age={self.cache_max_age}"}
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the educational animation pipeline over HTTP and WebSocket."
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--output-dir", default="pipeline_outputs")
+    parser.add_argument(
+        "--workers", type=int, default=3, help="Pipeline worker threads"
+    )
+    parser.add_argument(
+        "--image-backend", default="titan", choices=["titan", "local", "auto"]
+    )
+    parser.add_argument("--combined-llm-calls", action="store_true")
+    parser.add_argument("--cache-max-age", type=int, default=3600)
+    parser.add_argument("--cors-origin", default="*")
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help="Use offline mock LLM, image and animation backends",
+    )
+    parser.add_argument(
+        "--mock-delay",
+        type=float,
+        default=1.0,
+        help="Scale of the simulated mock latencies",
+    )
+    args = parser.parse_args()
+
+    components = {"image_backend": args.image_backend}
+    if args.mock:
+        from mock_backends import mock_components
+
+        components = mock_components(args.output_dir, delay=args.mock_delay)
+
+    pipeline = EducationalAnimationPipeline(
+        output_base_dir=args.output_dir,
+        max_parallel_tasks=args.workers,
+        combined_llm_calls=args.combined_llm_calls,
+        **components,
+    )
+    server = LessonServer(
+        pipeline, cache_max_age=args.cache_max_age, cors_origin=args.cors_origin or None
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
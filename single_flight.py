@@ -0,0 +1,86 @@
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def lesson_key(
+    interest: str, focus_aspect: str, tier: str = "standard"
+) -> Tuple[str, str, str]:
+    """
+    Build the deduplication key of a lesson request.
+
+    Case and whitespace differences do not produce different lessons.
+    """
+    return (_normalize(interest), _normalize(focus_aspect), _normalize(tier))
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Initialize the SingleFlight group.
+
+        Concurrent calls with the same key share one in-flight computation
+        and all receive its result (or its exception).
+        """
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `func` once per key at a time.
+
+        Args:
+            key: Deduplication key
+            func: Zero-argument coroutine function computing the result
+
+        Returns:
+            Any: The result of the shared computation
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            # Run the computation as its own task so a cancelled caller
+            # does not cancel it for everyone else waiting on it
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.shared += 1
+            print(f"Joining in-flight request for {key}")
+
+        return await asyncio.shield(task)
+
+
+def test_single_flight():
+    """Test function for the SingleFlight class."""
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return ["Sun", "Earth"]
+
+    async def run():
+        group = SingleFlight()
+        key = lesson_key("Space ", "the  Sun")
+        results = await asyncio.gather(
+            *[group.do(key, compute) for _ in range(5)],
+            group.do(lesson_key("space", "the sun"), compute),
+        )
+        return group, results
+
+    group, results = asyncio.run(run())
+    print(f"{group.calls} calls, {len(runs)} computation(s), {group.shared} shared")
+    assert len(runs) == 1 and all(result == ["Sun", "Earth"] for result in results)
+
+
+if __name__ == "__main__":
+    test_single_flight()
@@ -1,11 +1,16 @@
 import boto3
+from botocore.config import Config
 import json
 import base64
+import io
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
+from PIL import Image
 from dotenv import load_dotenv
 
+from artifact_writer import ArtifactWriter, atomic_write
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -14,6 +19,34 @@ class TitanImageGenerator:
     DEFAULT_NEGATIVE_PROMPT = (
         "blurry, bad quality, distorted"  # Default negative prompt
     )
+    # (width, height) combinations accepted by Titan Image Generator v1
+    SUPPORTED_SIZES = [
+        (1024, 1024),
+        (768, 768),
+        (512, 512),
+        (768, 1152),
+        (384, 576),
+        (1152, 768),
+        (576, 384),
+        (768, 1280),
+        (384, 640),
+        (1280, 768),
+        (640, 384),
+        (896, 1152),
+        (448, 576),
+        (1152, 896),
+        (576, 448),
+        (768, 1408),
+        (384, 704),
+        (1408, 768),
+        (704, 384),
+        (640, 1408),
+        (320, 704),
+        (1408, 640),
+        (704, 320),
+        (1152, 640),
+        (640, 1152),
+    ]
 
     def __init__(
         self,
@@ -21,10 +54,18 @@ class TitanImageGenerator:
         aws_secret_access_key: Optional[str] = None,
         region_name: str = "us-east-1",
         profile_name: Optional[str] = None,
+        read_timeout: int = 60,
+        connect_timeout: int = 10,
+        artifact_writer: Optional[ArtifactWriter] = None,
     ):
         """
         Initialize Bedrock client for Titan Image Generator model.
+
+        `read_timeout` bounds how long a stuck `invoke_model` call can block.
+        With an `artifact_writer`, images are written off the request path
+        and the returned paths may still be in progress.
         """
+        self.artifact_writer = artifact_writer
         try:
             # Initialize session
             if profile_name:
@@ -52,7 +93,13 @@ class TitanImageGenerator:
 
             # Create Bedrock runtime client
             self.bedrock = session.client(
-                service_name="bedrock-runtime", region_name=region_name
+                service_name="bedrock-runtime",
+                region_name=region_name,
+                config=Config(
+                    read_timeout=read_timeout,
+                    connect_timeout=connect_timeout,
+                    retries={"max_attempts": 1},
+                ),
             )
             print("Successfully initialized Bedrock client")
 
@@ -73,6 +120,88 @@ class TitanImageGenerator:
             raise ValueError("CFG scale must be between 1 and 35")
         return True
 
+    @classmethod
+    def negotiate_size(cls, min_width: int, min_height: int) -> Tuple[int, int]:
+        """
+        Smallest supported image size covering `min_width` x `min_height`.
+
+        Sizes with the requested aspect ratio are preferred, so the image can
+        be downsized to the animation input without cropping or padding.
+        """
+        covering = [
+            (w, h) for w, h in cls.SUPPORTED_SIZES if w >= min_width and h >= min_height
+        ]
+        if not covering:
+            raise ValueError(f"No supported size covers {min_width}x{min_height}")
+        aspect = min_width / min_height
+        return min(
+            covering, key=lambda s: (abs(s[0] / s[1] - aspect) > 0.01, s[0] * s[1])
+        )
+
+    def _invoke(
+        self,
+        prompt: str,
+        cfg_scale: int,
+        seed: int,
+        quality: str,
+        width: int,
+        height: int,
+        num_images: int,
+        negative_prompt: Optional[str],
+    ) -> List[bytes]:
+        """Invoke the Titan model and return the decoded image bytes."""
+        # Validate parameters
+        self.validate_parameters(width, height, num_images, cfg_scale)
+
+        # Use default negative prompt if none provided
+        if not negative_prompt:
+            negative_prompt = self.DEFAULT_NEGATIVE_PROMPT
+
+        # Prepare the request body
+        request_body = {
+            "textToImageParams": {"text": prompt, "negativeText": negative_prompt},
+            "taskType": "TEXT_IMAGE",
+            "imageGenerationConfig": {
+                "cfgScale": cfg_scale,
+                "seed": seed,
+                "quality": quality,
+                "width": width,
+                "height": height,
+                "numberOfImages": num_images,
+            },
+        }
+
+        print(f"Request body: {json.dumps(request_body, indent=2)}")  # Debug print
+
+        print(f"Generating {num_images} images with prompt: '{prompt}'")
+
+        # Invoke the model
+        response = self.bedrock.invoke_model(
+            modelId="amazon.titan-image-generator-v1",
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps(request_body),
+        )
+
+        # Parse response and decode base64 images
+        response_body = json.loads(response.get("body").read())
+        return [
+            base64.b64decode(image_data)
+            for image_data in response_body.get("images", [])
+        ]
+
+    def _save(self, image_bytes: bytes, output_dir: str, prefix: str, idx: int) -> str:
+        """Write encoded image bytes as they came from the model."""
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        filename = f"{output_dir}/image_{prefix}_{idx + 1}.png"
+        if self.artifact_writer is not None:
+            self.artifact_writer.write_bytes(filename, image_bytes)
+            print(f"Queued image {idx + 1} for writing to {filename}")
+        else:
+            atomic_write(filename, image_bytes)
+            print(f"Saved image {idx + 1} to {filename}")
+        return filename
+
     def generate_images(
         self,
         prompt: str,
@@ -84,67 +213,77 @@ class TitanImageGenerator:
         num_images: int = 3,
         output_dir: str = "generated_images",
         negative_prompt: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
     ) -> List[str]:
         """
         Generate images using Titan Image Generator model.
         """
         try:
-            # Validate parameters
-            self.validate_parameters(width, height, num_images, cfg_scale)
-
-            # Use default negative prompt if none provided
-            if not negative_prompt:
-                negative_prompt = self.DEFAULT_NEGATIVE_PROMPT
-
-            # Prepare the request body
-            request_body = {
-                "textToImageParams": {"text": prompt, "negativeText": negative_prompt},
-                "taskType": "TEXT_IMAGE",
-                "imageGenerationConfig": {
-                    "cfgScale": cfg_scale,
-                    "seed": seed,
-                    "quality": quality,
-                    "width": width,
-                    "height": height,
-                    "numberOfImages": num_images,
-                },
-            }
-
-            print(f"Request body: {json.dumps(request_body, indent=2)}")  # Debug print
-
-            # Create output directory if it doesn't exist
-            Path(output_dir).mkdir(parents=True, exist_ok=True)
-
-            print(f"Generating {num_images} images with prompt: '{prompt}'")
-
-            # Invoke the model
-            response = self.bedrock.invoke_model(
-                modelId="amazon.titan-image-generator-v1",
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(request_body),
+            images = self._invoke(
+                prompt,
+                cfg_scale,
+                seed,
+                quality,
+                width,
+                height,
+                num_images,
+                negative_prompt,
             )
 
-            # Parse response
-            response_body = json.loads(response.get("body").read())
-
             # Save images and collect paths
-            image_paths = []
-            for idx, image_data in enumerate(response_body.get("images", [])):
-                # Decode base64 image
-                image_bytes = base64.b64decode(image_data)
+            return [
+                self._save(image_bytes, output_dir, filename_prefix or seed, idx)
+                for idx, image_bytes in enumerate(images)
+            ]
 
-                # Generate filename
-                filename = f"{output_dir}/image_{seed}_{idx + 1}.png"
+        except Exception as e:
+            raise Exception(f"Error generating images: {str(e)}")
 
-                # Save image
-                with open(filename, "wb") as f:
-                    f.write(image_bytes)
-                print(f"Saved image {idx + 1} to {filename}")
+    def generate_pil_images(
+        self,
+        prompt: str,
+        cfg_scale: int = 8,
+        seed: int = 42,
+        quality: str = "standard",
+        width: int = 512,
+        height: int = 512,
+        num_images: int = 1,
+        output_dir: Optional[str] = None,
+        negative_prompt: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], Image.Image]]:
+        """
+        Generate images and return them decoded in memory.
+
+        The encoded bytes are written to `output_dir` as returned by the
+        model (no re-encoding) if it is given, so callers can hand the
+        decoded image to the next stage without reading the PNG back.
 
-                image_paths.append(filename)
+        Returns:
+            List[Tuple[Optional[str], Image.Image]]: (saved path or None, image)
+        """
+        try:
+            images = self._invoke(
+                prompt,
+                cfg_scale,
+                seed,
+                quality,
+                width,
+                height,
+                num_images,
+                negative_prompt,
+            )
 
-            return image_paths
+            results = []
+            for idx, image_bytes in enumerate(images):
+                image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+                path = None
+                if output_dir is not None:
+                    path = self._save(
+                        image_bytes, output_dir, filename_prefix or seed, idx
+                    )
+                results.append((path, image))
+            return results
 
         except Exception as e:
             raise Exception(f"Error generating images: {str(e)}")